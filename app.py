@@ -1,5 +1,10 @@
 from flask import Flask, render_template
 from routes import routes_bp
+from compression import compressor
+from config import config
+from database_factory import database_pool
+from neo4j_handler import close_driver
+import atexit
 import os
 # import gunicorn #Dummy placeholder
 
@@ -7,6 +12,14 @@ app = Flask(__name__)
 app.config["UPLOAD_FOLDER"] = "uploads"
 app.register_blueprint(routes_bp)
 
+# Compress text responses for clients that accept gzip or brotli
+if config.compression_enabled:
+    compressor.init_app(app)
+
+# Close pooled database and graph connections when the worker shuts down
+atexit.register(database_pool.close_all)
+atexit.register(close_driver)
+
 
 @app.route("/")
 def home():
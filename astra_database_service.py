@@ -2,9 +2,11 @@
 Astra DB implementation of the database service interface.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from database_interface import DatabaseServiceInterface
+from deadline import bound_timeout_ms
+from rerank import candidate_count, rerank_results
 from openai_service import openai_service
 from datetime import datetime
 
@@ -51,53 +53,82 @@ class AstraDBService(DatabaseServiceInterface):
             logger.error(f"Astra DB health check failed: {e}")
             return False
 
-    def get_visitor_evidence_context(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def search_visitor_evidence(
+        self, query: str, limit: int = 5, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Vector search over visitor evidence, returning the matching documents most relevant first."""
+        embedding = vector if vector is not None else openai_service.get_embeddings(query)
+        collection = self._db.get_collection("visitorevidence")
+
+        # Perform a vector similarity search
+        results = collection.find(
+            sort={"$vector": embedding},
+            limit=candidate_count(limit),
+            projection={"Name": 1, "PolicyAssertion": 1, "Evidence": 1, "Year": 1, "$vector": 1},
+            include_similarity=True,
+            timeout_ms=bound_timeout_ms(operation="vector search"),
+        )
+
+        return rerank_results(list(results), limit)
+
+    def get_visitor_evidence_context(
+        self, query: str, limit: int = 5, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Get visitor evidence context from vector search."""
         try:
-            embedding = openai_service.get_embeddings(query)
-            collection = self._db.get_collection("visitorevidence")
-
-            # Perform a vector similarity search
-            results = collection.find(
-                sort={"$vector": embedding},
-                limit=limit,
-                projection={"Name": 1, "PolicyAssertion": 1, "Evidence": 1, "Year": 1},
-                include_similarity=True,
-            )
-
-            return list(results)
+            return self.search_visitor_evidence(query, limit, vector)
         except Exception as e:
             logger.error(f"Error getting visitor evidence context: {e}")
             return []
 
-    def get_policy_assertions(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+    def search_policy_assertions(
+        self, query: str, limit: int = 8, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Vector search over policy assertions, returning the matching documents most relevant first."""
+        collection = self._db.get_collection("assertions")
+        embedding = vector if vector is not None else openai_service.get_embeddings(query)
+
+        results = collection.find(
+            sort={"$vector": embedding},
+            limit=candidate_count(limit),
+            projection={"Name", "PolicyAssertion", "Page", "Year", "Link", "$vector"},
+            include_similarity=True,
+            timeout_ms=bound_timeout_ms(operation="vector search"),
+        )
+
+        return rerank_results(list(results), limit)
+
+    def get_policy_assertions(
+        self, query: str, limit: int = 8, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Get policy assertions from vector search."""
         try:
-            collection = self._db.get_collection("assertions")
-            embedding = openai_service.get_embeddings(query)
-
-            results = collection.find(
-                sort={"$vector": embedding},
-                limit=limit,
-                projection={"Name", "PolicyAssertion", "Page", "Year", "Link"},
-                include_similarity=True,
-            )
-
-            return list(results)
+            return self.search_policy_assertions(query, limit, vector)
         except Exception as e:
             logger.error(f"Error getting policy assertions: {e}")
             return []
 
-    def get_blog_assertions(self, query: str, limit: int = 18) -> List[Dict[str, Any]]:
-        """Get related blog assertions."""
+    def get_blog_assertions(
+        self, query: str, limit: int = 18, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get related blog assertions.
+
+        The blogs collection is vectorised server-side ($vectorize), so a precomputed vector is not used.
+        """
         try:
             collection = self._db.get_collection("blogs")
-            assertions_cursor = collection.find(sort={"$vectorize": query})
+            assertions_cursor = collection.find(
+                sort={"$vectorize": query},
+                limit=candidate_count(limit),
+                projection={"*": True},
+                include_similarity=True,
+                timeout_ms=bound_timeout_ms(operation="blog search"),
+            )
 
             # Convert the cursor to a list of documents
             assertions = list(assertions_cursor)
 
-            return assertions[:limit]
+            return rerank_results(assertions, limit)
         except Exception as e:
             logger.error(f"Error getting blog assertions: {e}")
             return []
@@ -113,7 +144,9 @@ class AstraDBService(DatabaseServiceInterface):
             logger.error(f"Upload failed: {e}")
             return False
 
-    def get_message_descriptions(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_message_descriptions(
+        self, query: str, limit: int = 10, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Get message descriptions - not implemented for Astra DB."""
         logger.warning("get_message_descriptions not implemented for Astra DB")
         return []
@@ -2,14 +2,104 @@
 Azure Cognitive Search implementation of the database service interface.
 """
 
-from typing import List, Dict, Any
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional
 import logging
 import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from html import escape
+from urllib.parse import urlsplit
+from config import config
 from database_interface import DatabaseServiceInterface
+from deadline import bound_timeout
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# Add Tailwind CSS CDN reference and open an HTML table with Tailwind classes
+RESULTS_TABLE_HEADER = (
+    "<link href='https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css' rel='stylesheet'>"
+    "<div class='overflow-x-auto'>"
+    "<table class='min-w-full bg-white border border-gray-200'>"
+    "<thead class='bg-gray-100'>"
+    "<tr>"
+    "<th class='px-4 py-2 border-b'>Date</th>"
+    "<th class='px-4 py-2 border-b'>Summary</th>"
+    "<th class='px-4 py-2 border-b'>Tag</th>"
+    "<th class='px-4 py-2 border-b'>ID</th>"
+    "</tr>"
+    "</thead>"
+    "<tbody>"
+)
+RESULTS_TABLE_FOOTER = "</tbody></table></div>"
+
+# One table row per message; every value is HTML-escaped before it is filled in
+RESULT_ROW_TEMPLATE = (
+    "<tr class='border-b'>"
+    "<td class='px-4 py-2'>{date}</td>"
+    "<td class='px-4 py-2'>{summary}</td>"
+    "<td class='px-4 py-2'>{tag}</td>"
+    "<td class='px-4 py-2'>"
+    "<a href='{url}' class='text-blue-500 underline' target='_blank'>{id}</a>"
+    "</td>"
+    "</tr>"
+)
+
+# Rows rendered before a chunk is yielded to a streamed response
+RESULTS_TABLE_CHUNK_ROWS = 100
+
+
+@lru_cache(maxsize=4096)
+def format_upload_date(upload_date: str) -> str:
+    """Format an ISO upload date as Day, Date, Time, keeping the original if it cannot be parsed."""
+    try:
+        return datetime.fromisoformat(upload_date).strftime("%A, %d %B %Y, %I:%M %p")
+    except (TypeError, ValueError):
+        return upload_date
+
+
+def safe_link(url: str) -> str:
+    """Return url if it is an http(s) link, otherwise "#", so stored URLs cannot run script."""
+    # urlsplit drops the whitespace and control characters browsers also ignore in a scheme
+    scheme = urlsplit(url.strip()).scheme.lower()
+    return url if scheme in ("http", "https") else "#"
+
+
+def iter_results_table(
+    results: Iterable[Dict[str, Any]], chunk_rows: int = RESULTS_TABLE_CHUNK_ROWS
+) -> Iterator[str]:
+    """
+    Render search results as an HTML table, consuming them lazily.
+
+    Args:
+        results: Message documents, e.g. an Azure search results iterator.
+        chunk_rows: Rows joined into each yielded chunk.
+
+    Returns:
+        An iterator of HTML chunks: the table header, batches of rows, then the footer.
+    """
+    yield RESULTS_TABLE_HEADER
+    rows = []
+    for result in results:
+        rows.append(
+            RESULT_ROW_TEMPLATE.format(
+                date=escape(format_upload_date(str(result.get("uploadDate") or ""))),
+                summary=escape(str(result.get("summary") or "")),
+                tag=escape(str(result.get("tag") or "")),
+                url=escape(safe_link(str(result.get("url") or ""))),
+                id=escape(str(result.get("id") or "")),
+            )
+        )
+        if len(rows) >= chunk_rows:
+            yield "".join(rows)
+            rows = []
+    if rows:
+        yield "".join(rows)
+    yield RESULTS_TABLE_FOOTER
+
 
 class AzureSearchService(DatabaseServiceInterface):
     """Azure Cognitive Search implementation of database service."""
@@ -17,11 +107,21 @@ class AzureSearchService(DatabaseServiceInterface):
     # Define class variable for fields to select
     FIELDS = ["id", "message", "summary", "uploadDate", "tag", "url"]
 
+    # Azure Search accepts at most this many actions per indexing request
+    MAX_BATCH_SIZE = 1000
+
     def __init__(self, search_endpoint: str = None, search_key: str = None, search_api_version: str = "2023-11-01"):
         self.search_endpoint = search_endpoint or os.getenv("AZURE_SEARCH_ENDPOINT")
         self.search_key = search_key or os.getenv("AZURE_SEARCH_KEY")
         self.search_api_version = search_api_version
         self._client = None
+        # Clients share one HTTP session, so connections stay open between calls
+        self._clients_lock = threading.Lock()
+        self._search_clients = {}
+        self._index_client = None
+        self._session = None
+        self._transport = None
+        self._pid = None
         self.initialize_connection()
 
     def initialize_connection(self) -> None:
@@ -43,120 +143,151 @@ class AzureSearchService(DatabaseServiceInterface):
             logger.error(f"Failed to initialize Azure Search connection: {e}")
             raise
 
-    def _get_search_client(self, index_name: str):
-        """Get a search client for a specific index."""
-        from azure.search.documents import SearchClient
+    def _client_options(self) -> Dict[str, Any]:
+        """Return the transport and retry policy shared by every client, creating them on first use."""
+        if self._pid != os.getpid():
+            # Connections cannot be shared with a forked worker, so start afresh in each process
+            self._search_clients = {}
+            self._index_client = None
+            self._session = None
+            self._transport = None
+            self._pid = os.getpid()
+        if self._transport is None:
+            import requests
+            from azure.core.pipeline.transport import RequestsTransport
+
+            session = requests.Session()
+            # Retries are left to the Azure retry policy, which understands throttling responses
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=config.azure_search_pool_size,
+                pool_maxsize=config.azure_search_pool_size,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._transport = RequestsTransport(
+                session=session,
+                session_owner=False,
+                connection_timeout=config.azure_search_connection_timeout,
+                read_timeout=config.azure_search_read_timeout,
+            )
+        from azure.core.pipeline.policies import RetryPolicy
+
+        retry_policy = RetryPolicy(
+            retry_total=config.azure_search_retry_total, retry_backoff_factor=config.azure_search_retry_backoff
+        )
+        return {"transport": self._transport, "retry_policy": retry_policy}
 
-        return SearchClient(endpoint=self.search_endpoint, index_name=index_name, credential=self._credential)
+    def _get_search_client(self, index_name: str):
+        """Get the cached search client for a specific index."""
+        with self._clients_lock:
+            options = self._client_options()
+            client = self._search_clients.get(index_name)
+            if client is None:
+                from azure.search.documents import SearchClient
+
+                client = SearchClient(
+                    endpoint=self.search_endpoint, index_name=index_name, credential=self._credential, **options
+                )
+                self._search_clients[index_name] = client
+            return client
+
+    def _get_index_client(self):
+        """Get the cached index management client."""
+        with self._clients_lock:
+            options = self._client_options()
+            if self._index_client is None:
+                from azure.search.documents.indexes import SearchIndexClient
+
+                self._index_client = SearchIndexClient(
+                    endpoint=self.search_endpoint, credential=self._credential, **options
+                )
+            return self._index_client
 
     def close_connection(self) -> None:
-        """Close the Azure Search connection if needed."""
-        # Azure Search client doesn't require explicit closing
+        """Close the cached clients and their shared HTTP session."""
+        with self._clients_lock:
+            clients = list(self._search_clients.values())
+            if self._index_client is not None:
+                clients.append(self._index_client)
+            for client in clients:
+                try:
+                    client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing Azure Search client: {e}")
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._search_clients = {}
+            self._index_client = None
+            self._session = None
+            self._transport = None
         logger.info("Azure Search connection closed")
 
     def health_check(self) -> bool:
         """Check if the Azure Search connection is healthy."""
         try:
             # Try to get service statistics as a health check
-            from azure.search.documents.indexes import SearchIndexClient
-
-            index_client = SearchIndexClient(endpoint=self.search_endpoint, credential=self._credential)
-            stats = index_client.get_service_statistics()
+            self._get_index_client().get_service_statistics()
             return True
         except Exception as e:
             logger.error(f"Azure Search health check failed: {e}")
             return False
 
-    def get_visitor_evidence_context(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def get_visitor_evidence_context(
+        self, query: str, limit: int = 5, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Not implemented for Azure Search - use get_message_descriptions instead."""
         logger.warning("get_visitor_evidence_context not implemented for Azure Search")
         return []
 
-    def get_policy_assertions(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+    def get_policy_assertions(
+        self, query: str, limit: int = 8, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Not implemented for Azure Search - use get_message_descriptions instead."""
         logger.warning("get_policy_assertions not implemented for Azure Search")
         return []
 
-    def get_blog_assertions(self, query: str, limit: int = 18) -> List[Dict[str, Any]]:
+    def get_blog_assertions(
+        self, query: str, limit: int = 18, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Not implemented for Azure Search - use get_message_descriptions instead."""
         logger.warning("get_blog_assertions not implemented for Azure Search")
         return []
 
     def _format_results_as_table(self, results) -> str:
         """Format search results as an HTML table with Tailwind CSS styling and hyperlink for ID."""
-        table_rows = []
-        for result in results:
-            doc_id = result.get("id", "")
-            summary = result.get("summary", "")
-            upload_date = result.get("uploadDate", "")
-            tag = result.get("tag", "")
-            url = result.get("url", "#")  # Default to '#' if URL is not provided
-            try:
-                # Format the date as Day, Date, Time
-                formatted_date = datetime.fromisoformat(upload_date).strftime("%A, %d %B %Y, %I:%M %p")
-            except ValueError:
-                formatted_date = upload_date  # Keep original if parsing fails
-            table_rows.append(
-                f"<tr class='border-b'>"
-                f"<td class='px-4 py-2'>{formatted_date}</td>"
-                f"<td class='px-4 py-2'>{summary}</td>"
-                f"<td class='px-4 py-2'>{tag}</td>"
-                f"<td class='px-4 py-2'>"
-                f"<a href='{url}' class='text-blue-500 underline' target='_blank'>{doc_id}</a>"
-                f"</td>"
-                f"</tr>"
-            )
+        return "".join(iter_results_table(results))
 
-        # Add Tailwind CSS CDN reference
-        tailwind_cdn = (
-            "<link href='https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css' rel='stylesheet'>"
-        )
+    def search_messages(
+        self, query: str, limit: int = 10, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Vector search over messages, returning the matching documents most relevant first."""
+        from openai_service import openai_service
 
-        # Create an HTML table with Tailwind classes
-        table_html = f"""
-        {tailwind_cdn}
-        <div class='overflow-x-auto'>
-            <table class='min-w-full bg-white border border-gray-200'>
-                <thead class='bg-gray-100'>
-                    <tr>
-                        <th class='px-4 py-2 border-b'>Date</th>
-                        <th class='px-4 py-2 border-b'>Summary</th>
-                        <th class='px-4 py-2 border-b'>Tag</th>
-                        <th class='px-4 py-2 border-b'>ID</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
-        table_html += "".join(table_rows)
-        table_html += "</tbody></table></div>"
-
-        return table_html
-
-    def get_message_descriptions(self, query: str, limit: int = 10) -> str:
-        """Get message descriptions from vector search using Azure Cognitive Search."""
-        try:
-            from openai_service import openai_service
+        embedding = vector if vector is not None else openai_service.get_embeddings(query)
+        search_client = self._get_search_client("messages")
+        timeout = bound_timeout(operation="message search")
 
-            embedding = openai_service.get_embeddings(query)
-            search_client = self._get_search_client("messages")  # or your actual index name
+        # Perform vector search using Azure Cognitive Search
+        from azure.search.documents.models import VectorizedQuery
 
-            # Use the class variable for fields
-            fields = self.FIELDS
+        vector_query = VectorizedQuery(vector=embedding, k_nearest_neighbors=limit, fields="content_vector")
 
-            # Perform vector search using Azure Cognitive Search
-            from azure.search.documents.models import VectorizedQuery
-
-            vector_query = VectorizedQuery(vector=embedding, k_nearest_neighbors=limit, fields="content_vector")
-
-            results = search_client.search(
-                search_text=None,
-                vector_queries=[vector_query],
-                select=fields,
-                top=limit,
-            )
+        results = search_client.search(
+            search_text=None,
+            vector_queries=[vector_query],
+            select=self.FIELDS,
+            top=limit,
+            **({"timeout": timeout} if timeout else {}),
+        )
+        return [dict(result) for result in results]
 
+    def get_message_descriptions(self, query: str, limit: int = 10, vector: Optional[List[float]] = None) -> str:
+        """Get message descriptions from vector search using Azure Cognitive Search."""
+        try:
             # Directly format results as a table
-            return self._format_results_as_table(results)
+            return self._format_results_as_table(self.search_messages(query, limit, vector))
         except Exception as e:
             logger.error(f"Error getting message descriptions from Azure: {e}")
             return "<p>Error retrieving messages.</p>"
@@ -193,17 +324,236 @@ class AzureSearchService(DatabaseServiceInterface):
             logger.error(f"Upload failed: {e}")
             return False
 
-    def delete_all_documents(self, index_name: str) -> bool:
-        """Delete all documents in the specified index."""
+    def upload_documents_bulk(
+        self,
+        index_name: str,
+        documents: List[Dict[str, Any]],
+        batch_size: int = None,
+        concurrency: int = None,
+        progress: Optional[Callable] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ingest many documents with batched embedding, concurrent enrichment and chunked uploads.
+
+        Missing vectors are embedded in batches, missing summaries and tags are generated with
+        bounded concurrency, and documents are uploaded in chunks of at most batch_size. A
+        failure affects only the documents involved.
+
+        Args:
+            index_name: The index to upload to.
+            documents: Documents with at least 'id' and 'message' fields.
+            batch_size: Documents per index upload. Defaults to INGEST_BATCH_SIZE.
+            concurrency: Parallel summary/tag generations. Defaults to INGEST_CONCURRENCY.
+            progress: Optional progress(done, total, message) callback.
+
+        Returns:
+            A report with succeeded/failed counts and a per-document result list.
+
+        Raises:
+            ValueError: If a document has no id or two documents share one.
+        """
+        from openai_service import openai_service
+        from query_service import query_service
+
+        # Outcomes are tracked by id, so every document needs a distinct one
+        ids = [doc.get("id") for doc in documents]
+        if not all(ids):
+            raise ValueError("Every document needs an 'id'")
+        duplicates = sorted(str(doc_id) for doc_id, count in Counter(ids).items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Duplicate document ids: {', '.join(duplicates)}")
+
+        batch_size = min(batch_size or config.ingest_batch_size, 1000)
+        concurrency = concurrency or config.ingest_concurrency
+        total = len(documents)
+        outcomes = {}
+
+        def fail(doc, error):
+            outcomes[doc["id"]] = {"id": doc["id"], "status": "failed", "error": str(error)}
+
+        # Embed every document missing a vector, a batch at a time
+        pending = [doc for doc in documents if "content_vector" not in doc]
+        embedding_batch = config.ingest_embedding_batch
+        for start in range(0, len(pending), embedding_batch):
+            chunk = pending[start : start + embedding_batch]
+            try:
+                vectors = openai_service.get_embeddings_batch(
+                    [doc.get("message") or doc.get("content", "") for doc in chunk]
+                )
+                for doc, vector in zip(chunk, vectors):
+                    doc["content_vector"] = vector
+            except Exception as e:
+                logger.error(f"Failed to vectorise {len(chunk)} documents: {e}")
+                for doc in chunk:
+                    fail(doc, f"Embedding failed: {e}")
+            if progress:
+                progress(min(start + embedding_batch, len(pending)), total, "Embedding")
+
+        def enrich(doc):
+            if not doc.get("summary"):
+                doc["summary"] = query_service.summarise_message(doc.get("message", ""))
+            if not doc.get("tag"):
+                doc["tag"] = query_service.tag_summary(doc.get("summary", ""))
+
+        # Generate missing summaries and tags with bounded concurrency
+        to_enrich = [
+            doc for doc in documents if doc["id"] not in outcomes and not (doc.get("summary") and doc.get("tag"))
+        ]
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest") as executor:
+            futures = [(doc, executor.submit(enrich, doc)) for doc in to_enrich]
+            for done, (doc, future) in enumerate(futures, start=1):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Failed to summarise or tag document {doc['id']}: {e}")
+                    fail(doc, f"Summary or tag generation failed: {e}")
+                if progress:
+                    progress(done, total, "Summarising and tagging")
+
+        # Upload the remaining documents in bounded batches
+        ready = [doc for doc in documents if doc["id"] not in outcomes]
+        client = self._get_search_client(index_name)
+        for start in range(0, len(ready), batch_size):
+            chunk = ready[start : start + batch_size]
+            try:
+                for result in client.upload_documents(documents=chunk):
+                    if result.succeeded:
+                        outcomes[result.key] = {"id": result.key, "status": "success"}
+                    else:
+                        outcomes[result.key] = {"id": result.key, "status": "failed", "error": result.error_message}
+            except Exception as e:
+                logger.error(f"Upload of {len(chunk)} documents to {index_name} failed: {e}")
+                for doc in chunk:
+                    fail(doc, f"Upload failed: {e}")
+            if progress:
+                progress(min(start + batch_size, len(ready)), total, "Uploading")
+
+        results = [
+            outcomes.get(doc["id"], {"id": doc["id"], "status": "failed", "error": "No result returned"})
+            for doc in documents
+        ]
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        logger.info(f"Bulk upload to {index_name}: {succeeded} of {total} documents succeeded")
+        return {"total": total, "succeeded": succeeded, "failed": total - succeeded, "results": results}
+
+    def delete_all_documents(
+        self,
+        index_name: str,
+        progress: Optional[Callable] = None,
+        batch_size: int = None,
+        concurrency: int = None,
+        max_passes: int = None,
+        key_field: str = "id",
+        dedupe_seconds: float = None,
+    ) -> Any:
+        """
+        Delete every document in an index without loading it into memory.
+
+        Only the key field is selected. Keys are streamed page by page and deleted in batches
+        of at most MAX_BATCH_SIZE, with up to concurrency batches in flight. Deleting while
+        paging can shift later pages past the cursor, so passes repeat until one finds no
+        keys left to delete or max_passes is reached. Failed keys are retried on the next pass.
+
+        Deleted keys can stay visible to search for a moment, so keys deleted within the last
+        dedupe_seconds are skipped rather than deleted again. Memory therefore holds only the
+        batches in flight, that recent window and the failed keys, not the whole index.
+
+        Args:
+            index_name: The index to empty.
+            progress: Optional progress(done, total, message) callback.
+            batch_size: Keys per delete request. Defaults to DELETE_BATCH_SIZE.
+            concurrency: Delete requests in flight. Defaults to DELETE_CONCURRENCY.
+            max_passes: Search passes over the index. Defaults to DELETE_MAX_PASSES.
+            key_field: The index's key field.
+            dedupe_seconds: How long a deleted key is remembered. Defaults to DELETE_DEDUPE_SECONDS.
+
+        Returns:
+            A report with deleted/failed counts, the keys that could not be deleted and the
+            number of passes, or False if the index could not be read.
+        """
+        batch_size = max(1, min(batch_size or config.delete_batch_size, self.MAX_BATCH_SIZE))
+        concurrency = max(1, concurrency or config.delete_concurrency)
+        max_passes = max(1, max_passes or config.delete_max_passes)
+        dedupe_seconds = config.delete_dedupe_seconds if dedupe_seconds is None else dedupe_seconds
+        lock = threading.Lock()
+        # Recently deleted keys in deletion order, with the time they were deleted
+        recent = OrderedDict()
+        failures = {}
+        deleted = 0
+
+        def seen_recently(key: str) -> bool:
+            cutoff = time.monotonic() - dedupe_seconds
+            with lock:
+                while recent and next(iter(recent.values())) < cutoff:
+                    recent.popitem(last=False)
+                return key in recent
+
+        def delete_batch(keys: List[str]) -> None:
+            nonlocal deleted
+            try:
+                results = client.delete_documents(documents=[{key_field: key} for key in keys])
+            except Exception as e:
+                logger.error(f"Delete of {len(keys)} documents from {index_name} failed: {e}")
+                with lock:
+                    failures.update((key, str(e)) for key in keys)
+                return
+            now = time.monotonic()
+            with lock:
+                for result in results:
+                    if result.succeeded:
+                        deleted += 1
+                        recent[result.key] = now
+                        recent.move_to_end(result.key)
+                        failures.pop(result.key, None)
+                    else:
+                        failures[result.key] = result.error_message
+
         try:
             client = self._get_search_client(index_name)
-            client.delete_documents(documents=[{"id": doc["id"]} for doc in client.search("*")])
-            logger.info(f"Deleted all documents from {index_name}")
-            return True
+            total = client.get_document_count()
+            passes = 0
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="delete") as executor:
+                while passes < max_passes:
+                    passes += 1
+                    pending = set()
+                    found = 0
+                    batch = []
+                    for document in client.search(search_text="*", select=[key_field]):
+                        key = document[key_field]
+                        if seen_recently(key):
+                            continue
+                        found += 1
+                        batch.append(key)
+                        if len(batch) < batch_size:
+                            continue
+                        pending.add(executor.submit(delete_batch, batch))
+                        batch = []
+                        # Bound the batches in flight, and with them the keys waiting to be deleted
+                        if len(pending) >= concurrency:
+                            _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            if progress:
+                                progress(deleted, max(total, deleted), f"Deleting (pass {passes})")
+                    if batch:
+                        pending.add(executor.submit(delete_batch, batch))
+                    wait(pending)
+                    if progress:
+                        progress(deleted, max(total, deleted), f"Deleting (pass {passes})")
+                    if not found:
+                        break
         except Exception as e:
             logger.error(f"Failed to delete documents from {index_name}: {e}")
             return False
 
+        logger.info(
+            f"Deleted {deleted} documents from {index_name} in {passes} passes ({len(failures)} failed)"
+        )
+        return {
+            "deleted": deleted,
+            "failed": len(failures),
+            "failures": [{"id": key, "error": error} for key, error in failures.items()],
+            "passes": passes,
+        }
+
     def delete_document_by_id(self, index_name: str, document_id: str) -> bool:
         """Delete a specific document by its ID from the specified index."""
         try:
@@ -215,51 +565,69 @@ class AzureSearchService(DatabaseServiceInterface):
             logger.error(f"Failed to delete document with ID {document_id} from {index_name}: {e}")
             return False
 
-    def get_messages_since(self, since_date: datetime, return_format="html") -> str:
-        """Get messages uploaded since the given date."""
-        try:
-            search_client = self._get_search_client("messages")
+    def _search_messages_since(self, since_date: datetime):
+        """Return a lazy iterator over messages uploaded since the given date."""
+        search_client = self._get_search_client("messages")
 
-            # Convert since_date to UTC
-            since_date_utc = since_date.astimezone(timezone.utc)
+        # Convert since_date to UTC
+        since_date_utc = since_date.astimezone(timezone.utc)
 
-            # Use the class variable for fields
-            fields = self.FIELDS
+        # Perform a search query to filter messages by uploadDate
+        return search_client.search(
+            search_text=None,
+            filter=f"uploadDate ge {since_date_utc.isoformat()}",
+            select=self.FIELDS,
+        )
 
-            # Perform a search query to filter messages by uploadDate
-            results = search_client.search(
-                search_text=None,
-                filter=f"uploadDate ge {since_date_utc.isoformat()}",
-                select=fields,
-            )
+    def find_messages_since(self, since_date: datetime, return_format="html"):
+        """Get messages uploaded since the given date as an HTML table or a list, raising on failure."""
+        results = self._search_messages_since(since_date)
 
-            # Convert Azure Search results to a list of dictionaries and sort by score in descending order
-            formatted_results = []
-            for result in results:
-                formatted_results.append(
-                    {
-                        "id": result.get("id", ""),
-                        "summary": result.get("summary", ""),
-                        "uploadDate": result.get("uploadDate", ""),
-                        "tag": result.get("tag", ""),
-                        "url": result.get("url", ""),
-                        "score": result.get("@search.score", 0),
-                    }
-                )
+        if return_format != "json":
+            # Format results as a table as they arrive
+            return self._format_results_as_table(results)
 
-            # Sort results by score in descending order
-            formatted_results.sort(key=lambda x: x["score"], reverse=True)
+        # Convert Azure Search results to a list of dictionaries and sort by score in descending order
+        formatted_results = [
+            {
+                "id": result.get("id", ""),
+                "summary": result.get("summary", ""),
+                "uploadDate": result.get("uploadDate", ""),
+                "tag": result.get("tag", ""),
+                "url": result.get("url", ""),
+                "score": result.get("@search.score", 0),
+            }
+            for result in results
+        ]
+        formatted_results.sort(key=lambda x: x["score"], reverse=True)
+        return formatted_results
 
-            # If a specific return format is requested, use it
-            if return_format == "json":
-                return formatted_results
-            else:
-                # Format sorted results as a table
-                return self._format_results_as_table(formatted_results)
+    def get_messages_since(self, since_date: datetime, return_format="html") -> str:
+        """Get messages uploaded since the given date."""
+        try:
+            return self.find_messages_since(since_date, return_format)
         except Exception as e:
             logger.error(f"Error getting messages since {since_date}: {e}")
             return "<p>Error retrieving messages.</p>"
 
+    def stream_messages_since(self, since_date: datetime) -> Iterator[str]:
+        """
+        Yield an HTML table of messages uploaded since the given date in chunks.
+
+        Results are rendered as Azure pages them in, so memory use does not grow with the
+        number of messages and the first rows can be sent before the search completes.
+        """
+        table_open = False
+        try:
+            for chunk in iter_results_table(self._search_messages_since(since_date)):
+                table_open = chunk is not RESULTS_TABLE_FOOTER
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming messages since {since_date}: {e}")
+            if table_open:
+                yield RESULTS_TABLE_FOOTER
+            yield "<p>Error retrieving messages.</p>"
+
     def retag_message(self, message_id: str) -> bool:
         """Retag a message in Azure Cognitive Search by ID."""
         try:
@@ -285,13 +653,14 @@ class AzureSearchService(DatabaseServiceInterface):
             logger.error(f"Failed to retag message with ID {message_id}: {e}")
             return False
 
-    def retag_all_messages(self) -> bool:
-        """Retag all messages in Azure Cognitive Search."""
+    def retag_all_messages(self, progress: Optional[Callable] = None) -> bool:
+        """Retag all messages in Azure Cognitive Search, reporting progress(done, total) if given."""
         try:
             client = self._get_search_client("messages")
 
             # Fetch all documents in the index
-            results = client.search("*", select=self.FIELDS)
+            results = client.search("*", select=self.FIELDS, include_total_count=True)
+            total = results.get_count()
 
             documents_to_update = []
 
@@ -303,10 +672,14 @@ class AzureSearchService(DatabaseServiceInterface):
                 # Update the document with the new tag
                 document["tag"] = new_tag
                 documents_to_update.append(document)
+                if progress:
+                    progress(len(documents_to_update), total, "Generating tags")
 
             # Batch update all documents
             if documents_to_update:
                 client.merge_or_upload_documents(documents=documents_to_update)
+                if progress:
+                    progress(len(documents_to_update), len(documents_to_update), "Tags saved")
 
             logger.info("All messages retagged successfully.")
             return True
@@ -0,0 +1,66 @@
+"""
+Microbenchmark for TextFormatter rendering.
+
+Compares the per-call cost of rendering a large answer with the reusable pipeline
+against the previous approach (a new Markdown parser per call plus string replacement
+passes) with the same output wrapper.
+
+Usage: python bench_text_formatter.py [--rows 200] [--repeat 200]
+"""
+
+import argparse
+import timeit
+
+import markdown
+
+from text_formatter import text_formatter
+
+
+def legacy_format_to_html(text: str) -> str:
+    html = markdown.markdown(text, extensions=["markdown.extensions.tables"])
+    html = html.replace("\n", "")
+    html = html.replace("<table>", "<br><table class='table-auto border-collapse border border-gray-300'>")
+    html = html.replace("<th>", "<th class='border border-gray-300 bg-gray-100 px-4 py-2 text-left'>")
+    html = html.replace("<td>", "<td class='border border-gray-300 px-4 py-2'>")
+    tailwind_cdn = (
+        "<link href='https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css' rel='stylesheet'>"
+    )
+    return (
+        f"{tailwind_cdn}"
+        "<div class='prose max-w-none bg-gradient-to-r from-blue-50 to-blue-100 "
+        "p-12 rounded-2xl shadow-xl hover:shadow-2xl transition-shadow duration-300 border border-blue-200'>"
+        f"{html}"
+        "</div>"
+    )
+
+
+def large_answer(rows: int) -> str:
+    paragraphs = "\n\n".join(
+        f"Paragraph {index} discusses **peatland restoration** and *species recovery* in detail." for index in range(40)
+    )
+    table = "| Site | Species | Year | Notes |\n|---|---|---|---|\n" + "\n".join(
+        f"| Site {index} | Beaver | {2000 + index % 25} | Monitoring continues |" for index in range(rows)
+    )
+    return f"# Analysis\n\n{paragraphs}\n\n{table}\n\n- Summary point one\n- Summary point two\n"
+
+
+def measure(label: str, fn, repeat: int) -> None:
+    seconds = min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat
+    print(f"{label:<40} {seconds * 1e3:8.3f} ms/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200, help="table rows in the markdown answer")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per measurement")
+    args = parser.parse_args()
+
+    answer = large_answer(args.rows)
+    print(f"Answer: {len(answer)} characters, {args.rows} table rows\n")
+
+    measure("format_to_html (legacy)", lambda: legacy_format_to_html(answer), args.repeat)
+    measure("format_to_html", lambda: text_formatter.format_to_html(answer), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
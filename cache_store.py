@@ -0,0 +1,167 @@
+"""
+Reusable cache storage tiers: a thread-safe in-memory LRU and a SQLite-backed store.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with optional time-to-live expiry."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_size: Maximum number of entries kept before the least recently used is evicted.
+            ttl: Seconds an entry stays valid. None or 0 disables expiry.
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl or None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond max_size."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteStore:
+    """
+    Persistent key/blob store backed by SQLite.
+
+    The store is shared between gunicorn workers through the database file. Errors are
+    logged and treated as cache misses so a broken or locked file never fails a request.
+    """
+
+    # Check the row count every this many writes rather than on each insert
+    EVICTION_INTERVAL = 256
+
+    def __init__(self, path: str, table: str = "cache", max_entries: int = 100000, ttl: Optional[float] = None):
+        """
+        Args:
+            path: Location of the SQLite database file.
+            table: Table name, allowing several caches to share one file.
+            max_entries: Rows kept before the least recently used are deleted.
+            ttl: Seconds an entry stays valid. None or 0 disables expiry.
+        """
+        self.path = path
+        self.table = table
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl or None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = None
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache at {self.path} unavailable, continuing without it: {e}")
+            self._conn = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored blob, or None if missing, expired or the store is unavailable."""
+        if self._conn is None:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if self.ttl is not None and now - row[1] > self.ttl:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    return None
+                self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed: {e}")
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store a blob, periodically trimming the table to max_entries."""
+        if self._conn is None:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, sqlite3.Binary(value), now, now),
+                )
+                self._writes += 1
+                if self._writes % self.EVICTION_INTERVAL == 0:
+                    self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {e}")
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM {self.table}")
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache clear failed: {e}")
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
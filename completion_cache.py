@@ -0,0 +1,96 @@
+"""
+Content-addressed cache for completions of idempotent prompts.
+"""
+
+import hashlib
+import json
+import threading
+from typing import List, Optional
+
+from cache_store import LRUCache, SqliteStore
+
+
+class MemoryCompletionBackend:
+    """In-process completion storage with LRU eviction."""
+
+    def __init__(self, max_size: int = 4096, ttl: Optional[float] = None):
+        self._cache = LRUCache(max_size=max_size, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class SqliteCompletionBackend:
+    """Persistent completion storage shared between worker processes."""
+
+    def __init__(self, path: str, max_entries: int = 100000, ttl: Optional[float] = None):
+        self._store = SqliteStore(path, table="completions", max_entries=max_entries, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        blob = self._store.get(key)
+        return blob.decode("utf-8") if blob is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        self._store.set(key, value.encode("utf-8"))
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+class CompletionCache:
+    """
+    Caches completions keyed on the model, a hash of the prompt and the sampling parameters.
+
+    Backends are consulted in order (fastest first). A hit in a slower backend is copied
+    into the faster ones, and new completions are written to all of them.
+    """
+
+    def __init__(self, backends: List):
+        self.backends = backends
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(model: str, messages: list, params: dict = None) -> str:
+        """Build a content-addressed key for a completion request."""
+        payload = json.dumps({"model": model, "messages": messages, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion, or None on a miss."""
+        for index, backend in enumerate(self.backends):
+            value = backend.get(key)
+            if value is not None:
+                for faster in self.backends[:index]:
+                    faster.set(key, value)
+                self._count("hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a completion in every backend."""
+        for backend in self.backends:
+            backend.set(key, value)
+
+    def clear(self) -> None:
+        """Remove all cached completions."""
+        for backend in self.backends:
+            backend.clear()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        """Return hit and miss counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["backends"] = [type(backend).__name__ for backend in self.backends]
+        return stats
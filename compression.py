@@ -0,0 +1,116 @@
+"""
+Response compression with gzip or brotli negotiated from Accept-Encoding.
+"""
+
+import gzip
+import logging
+from typing import Optional
+
+from flask import Flask, Response, request
+
+from config import config
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used when brotli is not installed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Text responses worth compressing; images, archives and Word documents are already compressed
+COMPRESSIBLE_MIMETYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+)
+
+
+class Compressor:
+    """Compresses eligible responses with the best encoding the client accepts."""
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        """
+        Args:
+            min_size: Smallest body in bytes worth compressing.
+            gzip_level: gzip compression level (1-9).
+            brotli_quality: brotli quality (0-11), used when the brotli package is installed.
+        """
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def init_app(self, app: Flask) -> None:
+        """Register the compressor to run after every request of the app."""
+        app.after_request(self.after_request)
+
+    def choose_encoding(self) -> Optional[str]:
+        """Return "br", "gzip" or None for the current request's Accept-Encoding."""
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"] > 0:
+            return "br"
+        if accepted["gzip"] > 0:
+            return "gzip"
+        return None
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        """Compress data with the chosen encoding ("br" or "gzip")."""
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level)
+
+    def after_request(self, response: Response) -> Response:
+        """Compress the response body in place when the client and the response allow it."""
+        # Streams (server-sent events, chunked tables) must reach the client as they are produced
+        if response.is_streamed or response.direct_passthrough:
+            return response
+        if response.status_code == 304:
+            # Caches must pair the revalidated entry with the same encoding variant
+            response.vary.add("Accept-Encoding")
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206):
+            return response
+        if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if response.content_length is not None and response.content_length < self.min_size:
+            return response
+
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        compressed = self.compress(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        # The compressed bytes differ from those the ETag was computed over
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def conditional(response: Response) -> Response:
+    """Tag a deterministic response with an ETag, answering 304 if the client already has it."""
+    # Errors must not be cached or revalidated as if they were the resource
+    if response.status_code != 200:
+        return response
+    response.add_etag()
+    response.headers.setdefault("Cache-Control", "private, no-cache")
+    return response.make_conditional(request)
+
+
+# Global compressor instance
+compressor = Compressor(
+    min_size=config.compression_min_size,
+    gzip_level=config.compression_gzip_level,
+    brotli_quality=config.compression_brotli_quality,
+)
@@ -3,9 +3,56 @@ Configuration settings for the application.
 Supports multiple database providers (Astra DB and Azure Search).
 """
 
+import json
 import os
+import tempfile
 from typing import Optional
 
+# Model and sampling settings per prompt task. Cheap, high-volume tasks use a smaller model;
+# None leaves a parameter at the API default. Override with OPENAI_TASK_ROUTES (JSON).
+DEFAULT_TASK_ROUTES = {
+    "default": {"model": "gpt-4o", "max_tokens": None, "temperature": None, "timeout": 60},
+    "analysis": {"model": "gpt-4o"},
+    "enquiry": {"model": "gpt-4o"},
+    "policy": {"model": "gpt-4o"},
+    "blog": {"model": "gpt-4o"},
+    "advanced": {"model": "gpt-4o"},
+    "evidence_summary": {"model": "gpt-4o-mini", "max_tokens": 300, "temperature": 0.2, "timeout": 30},
+    "break_down_query": {"model": "gpt-4o-mini", "max_tokens": 400, "temperature": 0, "timeout": 30},
+    "summarise_message": {"model": "gpt-4o-mini", "max_tokens": 120, "temperature": 0.2, "timeout": 20},
+    "tag_summary": {"model": "gpt-4o-mini", "max_tokens": 16, "temperature": 0, "timeout": 15},
+}
+
+# Time budget in seconds per endpoint; a request's X-Request-Deadline header can override it.
+# Endpoints not listed have no deadline. Override with REQUEST_DEADLINES (JSON, 0 disables).
+DEFAULT_REQUEST_DEADLINES = {
+    "/enquiries": 60,
+    "/policyquery": 60,
+    "/visitorevidence": 90,
+    "/blog": 120,
+    "/messages": 20,
+    "/search": 20,
+    "/hybrid": 20,
+}
+
+# Token budgets for the retrieved context in each prompt. Override with CONTEXT_TOKEN_BUDGETS (JSON);
+# 0 removes the limit.
+DEFAULT_CONTEXT_BUDGETS = {
+    "default": 3000,
+    "visitor_evidence": 2500,
+    "policy": 3000,
+    "enquiry": 3000,
+    "blog_assertions": 2500,
+    "blog_policies": 1500,
+    "advanced": 6000,
+}
+
+# USD per million input and output tokens, used for cost statistics. Override with OPENAI_MODEL_PRICES (JSON).
+DEFAULT_MODEL_PRICES = {
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+}
+
 
 class Config:
     """Application configuration class supporting multiple database providers."""
@@ -27,6 +74,126 @@ class Config:
         self.azure_search_key = os.getenv("AZURE_SEARCH_KEY")
         self.azure_search_api_version = os.getenv("AZURE_SEARCH_API_VERSION", "2023-11-01")
 
+        # Per-task model routing and pricing
+        self.task_routes = self._load_task_routes(os.getenv("OPENAI_TASK_ROUTES", ""))
+        self.model_prices = {**DEFAULT_MODEL_PRICES, **json.loads(os.getenv("OPENAI_MODEL_PRICES") or "{}")}
+
+        # Azure Search HTTP connections shared per worker process (timeouts in seconds)
+        self.azure_search_pool_size = int(os.getenv("AZURE_SEARCH_POOL_SIZE", "20"))
+        self.azure_search_connection_timeout = float(os.getenv("AZURE_SEARCH_CONNECTION_TIMEOUT", "5"))
+        self.azure_search_read_timeout = float(os.getenv("AZURE_SEARCH_READ_TIMEOUT", "60"))
+        self.azure_search_retry_total = int(os.getenv("AZURE_SEARCH_RETRY_TOTAL", "3"))
+        self.azure_search_retry_backoff = float(os.getenv("AZURE_SEARCH_RETRY_BACKOFF", "0.8"))
+
+        # OpenAI rate limiting per worker process (0 disables a budget or the concurrency cap)
+        self.openai_requests_per_minute = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+        self.openai_tokens_per_minute = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "300000"))
+        self.openai_max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+        self.openai_max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+        self.openai_backoff_base = float(os.getenv("OPENAI_BACKOFF_BASE", "1"))
+        self.openai_backoff_max = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+
+        # Embedding cache configuration (set EMBEDDING_CACHE_PATH to "" to disable the disk tier)
+        self.embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+        self.embedding_cache_ttl = int(os.getenv("EMBEDDING_CACHE_TTL", "604800"))
+        self.embedding_cache_path = os.getenv(
+            "EMBEDDING_CACHE_PATH", os.path.join(tempfile.gettempdir(), "scotwildai_cache.sqlite")
+        )
+        self.embedding_cache_disk_entries = int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "100000"))
+
+        # Completion cache for idempotent prompts (set COMPLETION_CACHE_PATH to "" for memory only)
+        self.completion_cache_size = int(os.getenv("COMPLETION_CACHE_SIZE", "4096"))
+        self.completion_cache_ttl = int(os.getenv("COMPLETION_CACHE_TTL", "2592000"))
+        self.completion_cache_path = os.getenv(
+            "COMPLETION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "scotwildai_cache.sqlite")
+        )
+        self.completion_cache_disk_entries = int(os.getenv("COMPLETION_CACHE_DISK_ENTRIES", "100000"))
+
+        # Embedding request coalescing (a window of 0 sends each request on its own)
+        self.embedding_batch_window_ms = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+        self.embedding_batch_max_size = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+
+        # Concurrent LLM calls within a request
+        self.llm_call_timeout = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
+        self.llm_max_workers = int(os.getenv("LLM_MAX_WORKERS", "8"))
+
+        # Parallel retrieval across collections
+        self.retrieval_timeout = float(os.getenv("RETRIEVAL_TIMEOUT", "10"))
+        self.retrieval_max_workers = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8"))
+
+        # Request deadlines (per-endpoint budgets, header override cap, minimum time left for side work)
+        self.request_deadlines = {**DEFAULT_REQUEST_DEADLINES, **json.loads(os.getenv("REQUEST_DEADLINES") or "{}")}
+        self.request_deadline_max = float(os.getenv("REQUEST_DEADLINE_MAX", "300"))
+        self.deadline_evidence_summary_min = float(os.getenv("DEADLINE_EVIDENCE_SUMMARY_MIN", "10"))
+
+        # Reranking of vector search results (cutoff on the store's 0-1 similarity, MMR diversity,
+        # cosine similarity at which results count as duplicates, candidates fetched per result)
+        self.rerank_enabled = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+        self.rerank_min_similarity = float(os.getenv("RERANK_MIN_SIMILARITY", "0.8"))
+        self.rerank_diversity = float(os.getenv("RERANK_DIVERSITY", "0.3"))
+        self.rerank_duplicate_threshold = float(os.getenv("RERANK_DUPLICATE_THRESHOLD", "0.97"))
+        self.rerank_overfetch = float(os.getenv("RERANK_OVERFETCH", "1.5"))
+
+        # Response compression (bodies smaller than the minimum size in bytes are sent as they are)
+        self.compression_enabled = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+        self.compression_min_size = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        self.compression_gzip_level = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+        self.compression_brotli_quality = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+        # Advanced query component retrieval (per-component limit and merged document cap)
+        self.advanced_query_component_limit = int(os.getenv("ADVANCED_QUERY_COMPONENT_LIMIT", "15"))
+        self.advanced_query_max_documents = int(os.getenv("ADVANCED_QUERY_MAX_DOCUMENTS", "40"))
+
+        # Prompt context token budgets
+        self.context_budgets = {**DEFAULT_CONTEXT_BUDGETS, **json.loads(os.getenv("CONTEXT_TOKEN_BUDGETS") or "{}")}
+
+        # Neo4j driver connection pool (timeouts and lifetimes in seconds)
+        self.neo4j_max_pool_size = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+        self.neo4j_connection_acquisition_timeout = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "30"))
+        self.neo4j_liveness_check_timeout = float(os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT", "60"))
+        self.neo4j_max_connection_lifetime = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+
+        # Graph RAG (relationships from the vector index, cap on expanded relationships; 0 is unlimited)
+        self.graph_rag_top_k = int(os.getenv("GRAPH_RAG_TOP_K", "10"))
+        self.graph_rag_expand_limit = int(os.getenv("GRAPH_RAG_EXPAND_LIMIT", "0"))
+
+        # Hybrid retrieval (default sources and reciprocal-rank fusion constant)
+        self.hybrid_sources = [
+            source.strip()
+            for source in os.getenv(
+                "HYBRID_SOURCES", "astra:policy_assertions,astra:visitor_evidence,azure:messages,graph"
+            ).split(",")
+            if source.strip()
+        ]
+        self.hybrid_rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+
+        # Semantic response cache for query endpoints
+        self.semantic_cache_enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.semantic_cache_size = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+        self.semantic_cache_ttl = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+
+        # Background jobs (set JOB_STORE_PATH to "" to keep job state per process)
+        self.job_workers = int(os.getenv("JOB_WORKERS", "2"))
+        self.job_store_path = os.getenv(
+            "JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "scotwildai_jobs.sqlite")
+        )
+        # Unfinished jobs without a heartbeat for JOB_STALE_AFTER seconds are reported as failed
+        self.job_heartbeat_interval = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+        self.job_stale_after = float(os.getenv("JOB_STALE_AFTER", "60"))
+
+        # Bulk message ingestion
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+        self.ingest_concurrency = int(os.getenv("INGEST_CONCURRENCY", "8"))
+        self.ingest_embedding_batch = int(os.getenv("INGEST_EMBEDDING_BATCH", "256"))
+
+        # Bulk message deletion
+        self.delete_batch_size = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+        self.delete_concurrency = int(os.getenv("DELETE_CONCURRENCY", "4"))
+        self.delete_max_passes = int(os.getenv("DELETE_MAX_PASSES", "5"))
+        # Deleted keys can remain searchable briefly; they are not deleted again within this window
+        self.delete_dedupe_seconds = float(os.getenv("DELETE_DEDUPE_SECONDS", "30"))
+
         # API Key for securing routes
         self.api_key = os.getenv("API_KEY", "default_api_key")
 
@@ -34,6 +201,24 @@ class Config:
         self._client = None
         self._db = None
 
+    @staticmethod
+    def _load_task_routes(overrides: str) -> dict:
+        """Merge JSON task route overrides into the defaults, task by task."""
+        routes = {task: dict(route) for task, route in DEFAULT_TASK_ROUTES.items()}
+        for task, route in json.loads(overrides or "{}").items():
+            routes.setdefault(task, {}).update(route)
+        return routes
+
+    def task_route(self, task: Optional[str] = None) -> dict:
+        """Return the model, max_tokens, temperature and timeout for a task, filled from the default route."""
+        route = dict(self.task_routes["default"])
+        route.update(self.task_routes.get(task or "default", {}))
+        return route
+
+    def context_budget(self, name: str) -> int:
+        """Return the context token budget for a prompt, falling back to the default budget."""
+        return int(self.context_budgets.get(name, self.context_budgets["default"]))
+
     @property
     def database(self):
         """
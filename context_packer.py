@@ -0,0 +1,142 @@
+"""
+Token-aware packing of retrieved documents into prompt context.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from semantic_cache import VOLATILE_FIELDS
+
+try:
+    import tiktoken
+except ImportError:  # optional; token counts fall back to a character estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Store bookkeeping fields that carry no meaning for the model
+INTERNAL_FIELDS = ("_id", "$vectorize") + VOLATILE_FIELDS
+
+# Fields the prompts need from policy documents, in the order they are rendered. Visitor
+# evidence is rendered by TextFormatter.format_context_items, which reads only its own fields.
+POLICY_FIELDS = ("PolicyAssertion", "Name", "Year", "Page", "Link")
+
+
+class ContextPacker:
+    """
+    Packs ranked documents into a token budget.
+
+    Documents are taken in rank order and kept while they fit; anything that does not fit is
+    dropped and counted, so prompt size stays bounded however much the stores return.
+    """
+
+    def __init__(self, encoding: str = "o200k_base"):
+        """
+        Args:
+            encoding: tiktoken encoding used for counting when tiktoken is installed.
+        """
+        self.encoding_name = encoding
+        self._encoding = None
+        self._encoding_loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"packed": 0, "truncated": 0, "items_kept": 0, "items_dropped": 0, "tokens": 0}
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with tiktoken if available, otherwise estimate about four characters per token."""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    def _get_encoding(self):
+        if not self._encoding_loaded:
+            with self._lock:
+                if not self._encoding_loaded and tiktoken is not None:
+                    try:
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        logger.warning(f"tiktoken encoding {self.encoding_name} unavailable, estimating tokens: {e}")
+                self._encoding_loaded = True
+        return self._encoding
+
+    @staticmethod
+    def project(document: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Keep only the given fields (in that order), or every non-internal field if none are given."""
+        if fields is None:
+            return {key: value for key, value in document.items() if key not in INTERNAL_FIELDS}
+        return {field: document[field] for field in fields if document.get(field) not in (None, "")}
+
+    @staticmethod
+    def render(document: Dict[str, Any]) -> str:
+        """Render a projected document as one compact line."""
+        return "- " + "; ".join(f"{key}: {value}" for key, value in document.items())
+
+    def select(
+        self,
+        items: List[Any],
+        budget: int,
+        render: Callable[[Any], str],
+        name: str = "context",
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Keep the highest-ranked items whose rendered text fits the budget.
+
+        Args:
+            items: Items ordered best first.
+            budget: Token budget for all kept items. 0 or less keeps everything.
+            render: Renders one item as it will appear in the prompt.
+            name: Label used in logs.
+
+        Returns:
+            The kept items in their original order, and a report with the kept and dropped item
+            counts, tokens used, the budget and whether anything was dropped.
+        """
+        kept, used = [], 0
+        for item in items:
+            tokens = self.count_tokens(render(item))
+            if budget > 0 and used + tokens > budget:
+                continue
+            kept.append(item)
+            used += tokens
+        return kept, self._report(name, len(kept), len(items) - len(kept), used, budget)
+
+    def pack(
+        self,
+        documents: List[Dict[str, Any]],
+        budget: int,
+        fields: Optional[Iterable[str]] = None,
+        name: str = "context",
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Project documents to the needed fields and pack them into the budget as compact text.
+
+        Returns:
+            The packed context, one document per line, and the packing report from select.
+        """
+        lines = [self.render(self.project(document, fields)) for document in documents]
+        kept, report = self.select(lines, budget, lambda line: line, name)
+        return "\n".join(kept), report
+
+    def _report(self, name: str, kept: int, dropped: int, tokens: int, budget: int) -> Dict[str, Any]:
+        truncated = dropped > 0
+        with self._lock:
+            self._stats["packed"] += 1
+            self._stats["truncated"] += int(truncated)
+            self._stats["items_kept"] += kept
+            self._stats["items_dropped"] += dropped
+            self._stats["tokens"] += tokens
+        if truncated:
+            logger.info(f"Context '{name}' truncated to {kept} items ({tokens}/{budget} tokens), dropped {dropped}")
+        return {"items": kept, "dropped": dropped, "tokens": tokens, "budget": budget, "truncated": truncated}
+
+    def stats(self) -> dict:
+        """Return packing counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["tokenizer"] = self.encoding_name if self._get_encoding() is not None else "estimate"
+        return stats
+
+
+# Global packer instance
+context_packer = ContextPacker()
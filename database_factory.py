@@ -3,7 +3,10 @@ Factory for creating database service instances based on configuration.
 """
 
 import os
+import json
+import hashlib
 import logging
+import threading
 from typing import Union
 from database_interface import DatabaseServiceInterface
 from astra_database_service import AstraDBService
@@ -82,38 +85,191 @@ class DatabaseServiceFactory:
         logger.info(f"Using DATABASE_PROVIDER environment variable: {provider}")
         return provider
 
+    @classmethod
+    def resolve_settings(cls, provider: str, **kwargs) -> dict:
+        """
+        Resolve the effective connection settings for a provider.
+
+        Explicit keyword arguments take precedence over environment variables.
+
+        Args:
+            provider: The database provider ('astra' or 'azure').
+            **kwargs: Explicit settings overriding the environment.
+
+        Returns:
+            A dictionary of the settings the service would be created with.
+        """
+        provider = provider.lower()
+        if provider == "astra":
+            return {
+                "astra_endpoint": kwargs.get("astra_endpoint") or os.getenv("ASTRADB_ENDPOINT"),
+                "astra_token": kwargs.get("astra_token") or os.getenv("ASTRADB_TOKEN"),
+                "keyspace": kwargs.get("keyspace") or os.getenv("ASTRADB_KEYSPACE", "default_keyspace"),
+            }
+        elif provider == "azure":
+            return {
+                "search_endpoint": kwargs.get("search_endpoint") or os.getenv("AZURE_SEARCH_ENDPOINT"),
+                "search_key": kwargs.get("search_key") or os.getenv("AZURE_SEARCH_KEY"),
+                "search_api_version": kwargs.get("search_api_version", "2023-11-01"),
+            }
+        return dict(kwargs)
+
     @classmethod
     def _create_astra_service(cls, **kwargs) -> AstraDBService:
         """Create an Astra DB service instance."""
-        astra_endpoint = kwargs.get("astra_endpoint") or os.getenv("ASTRADB_ENDPOINT")
-        astra_token = kwargs.get("astra_token") or os.getenv("ASTRADB_TOKEN")
-        keyspace = kwargs.get("keyspace") or os.getenv("ASTRADB_KEYSPACE", "default_keyspace")
+        settings = cls.resolve_settings("astra", **kwargs)
 
-        if not astra_endpoint:
+        if not settings["astra_endpoint"]:
             raise ValueError("Astra DB endpoint is required but not found in environment variables")
 
-        if not astra_token:
+        if not settings["astra_token"]:
             raise ValueError("Astra DB token is required but not found in environment variables")
 
-        return AstraDBService(astra_endpoint=astra_endpoint, astra_token=astra_token, keyspace=keyspace)
+        return AstraDBService(**settings)
 
     @classmethod
     def _create_azure_service(cls, **kwargs) -> AzureSearchService:
         """Create an Azure Search service instance."""
-        search_endpoint = kwargs.get("search_endpoint") or os.getenv("AZURE_SEARCH_ENDPOINT")
-        search_key = kwargs.get("search_key") or os.getenv("AZURE_SEARCH_KEY")
-        search_api_version = kwargs.get("search_api_version", "2023-11-01")
+        return AzureSearchService(**cls.resolve_settings("azure", **kwargs))
+
+
+class DatabaseServicePool:
+    """
+    Process-wide, thread-safe pool of database service instances.
+
+    Services are keyed by provider and a fingerprint of their resolved settings, so
+    every request reuses the same warm client instead of reconnecting. The provider is
+    detected once, and the fingerprint is only recomputed when the resolved settings
+    differ from those last seen. When the settings change, the replaced instance is
+    closed after retire_after seconds, so requests already using it can finish.
+    """
+
+    # Seconds a replaced service stays open for requests that are still using it
+    RETIRE_AFTER = 60.0
+
+    def __init__(self, retire_after: float = None):
+        """
+        Args:
+            retire_after: Grace period before a replaced service is closed. Defaults to RETIRE_AFTER.
+        """
+        self.retire_after = self.RETIRE_AFTER if retire_after is None else retire_after
+        self._lock = threading.RLock()
+        self._services = {}
+        self._current = {}
+        self._retiring = {}
+        self._detected = None
+
+    @staticmethod
+    def fingerprint(settings: dict) -> str:
+        """Return a stable hash of service settings."""
+        payload = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_service(self, provider: str = None, **kwargs) -> DatabaseServiceInterface:
+        """
+        Get the pooled service for a provider, creating or rebuilding it as needed.
+
+        Args:
+            provider: The database provider. If not specified, it is auto-detected once.
+            **kwargs: Explicit settings overriding the environment.
 
-        return AzureSearchService(
-            search_endpoint=search_endpoint, search_key=search_key, search_api_version=search_api_version
-        )
+        Returns:
+            A shared database service instance.
+        """
+        if provider is None:
+            provider = self._detected or self._detect_provider()
+        provider = provider.lower()
+        settings = DatabaseServiceFactory.resolve_settings(provider, **kwargs)
+        # Callers passing the same overrides share one current entry per provider
+        caller = (provider, tuple(sorted(kwargs.items())))
+
+        current = self._current.get(caller)
+        if current is not None and current[0] == settings:
+            service = self._services.get(current[1])
+            if service is not None:
+                return service
+
+        stale = None
+        with self._lock:
+            key = (provider, self.fingerprint(settings))
+            service = self._services.get(key)
+            if service is None:
+                service = DatabaseServiceFactory.create_service(provider, **kwargs)
+                self._services[key] = service
+            previous = self._current.get(caller)
+            self._current[caller] = (settings, key)
+            if previous is not None and previous[1] != key:
+                if all(entry[1] != previous[1] for entry in self._current.values()):
+                    stale = self._services.pop(previous[1], None)
+
+        if stale is not None:
+            logger.info(f"Configuration for {provider} changed, retiring the previous pooled service")
+            self._retire(provider, stale)
+        return service
+
+    def _detect_provider(self) -> str:
+        with self._lock:
+            if self._detected is None:
+                self._detected = DatabaseServiceFactory._detect_provider()
+            return self._detected
+
+    def _retire(self, provider: str, service: DatabaseServiceInterface) -> None:
+        if self.retire_after <= 0:
+            self._close(provider, service)
+            return
+
+        def close() -> None:
+            with self._lock:
+                if self._retiring.pop(id(service), None) is None:
+                    return
+            self._close(provider, service)
+
+        timer = threading.Timer(self.retire_after, close)
+        timer.daemon = True
+        with self._lock:
+            self._retiring[id(service)] = (timer, provider, service)
+        timer.start()
+
+    def invalidate(self, provider: str) -> None:
+        """Close and drop every pooled service for a provider so the next call rebuilds it."""
+        provider = provider.lower()
+        with self._lock:
+            keys = [key for key in self._services if key[0] == provider]
+            services = [self._services.pop(key) for key in keys]
+            self._current = {caller: entry for caller, entry in self._current.items() if caller[0] != provider}
+            self._detected = None
+        for service in services:
+            self._close(provider, service)
+
+    def close_all(self) -> None:
+        """Close every pooled and retiring service. Registered as a shutdown hook by the app."""
+        with self._lock:
+            entries = [(provider, service) for (provider, _), service in self._services.items()]
+            retiring = list(self._retiring.values())
+            self._services.clear()
+            self._current.clear()
+            self._retiring.clear()
+            self._detected = None
+        for timer, provider, service in retiring:
+            timer.cancel()
+            entries.append((provider, service))
+        for provider, service in entries:
+            self._close(provider, service)
+
+    @staticmethod
+    def _close(provider: str, service: DatabaseServiceInterface) -> None:
+        try:
+            service.close_connection()
+        except Exception as e:
+            logger.warning(f"Error closing pooled {provider} database connection: {e}")
 
 
 class DatabaseServiceRegistry:
     """Registry to manage database service instances with singleton pattern."""
 
     _instance = None
-    _service = None
+    _provider = None
+    _kwargs = {}
 
     def __new__(cls):
         if cls._instance is None:
@@ -122,18 +278,20 @@ class DatabaseServiceRegistry:
 
     def get_service(self, provider: str = None, **kwargs) -> DatabaseServiceInterface:
         """
-        Get a database service instance, creating it if it doesn't exist.
+        Get the pooled database service for a provider.
+
+        Every call goes through the pool, so a settings change is picked up straight away.
 
         Args:
-            provider: The database provider.
+            provider: The database provider. Defaults to the one last switched to, or auto-detection.
             **kwargs: Additional arguments for service creation.
 
         Returns:
             A database service instance.
         """
-        if self._service is None:
-            self._service = DatabaseServiceFactory.create_service(provider, **kwargs)
-        return self._service
+        if provider is None and not kwargs:
+            provider, kwargs = self._provider, self._kwargs
+        return database_pool.get_service(provider, **kwargs)
 
     def switch_provider(self, provider: str, **kwargs) -> DatabaseServiceInterface:
         """
@@ -146,27 +304,18 @@ class DatabaseServiceRegistry:
         Returns:
             The new database service instance.
         """
-        # Close existing connection if it exists
-        if self._service:
-            try:
-                self._service.close_connection()
-            except Exception as e:
-                logger.warning(f"Error closing existing database connection: {e}")
-
-        # Create new service
-        self._service = DatabaseServiceFactory.create_service(provider, **kwargs)
+        # Services are shared through the pool, which owns their lifecycle
+        service = database_pool.get_service(provider, **kwargs)
+        self._provider, self._kwargs = provider, kwargs
         logger.info(f"Switched to {provider} database provider")
-        return self._service
+        return service
 
     def reset(self):
         """Reset the registry (useful for testing)."""
-        if self._service:
-            try:
-                self._service.close_connection()
-            except Exception as e:
-                logger.warning(f"Error closing database connection during reset: {e}")
-        self._service = None
+        database_pool.close_all()
+        self._provider, self._kwargs = None, {}
 
 
-# Global registry instance
+# Global pool and registry instances
+database_pool = DatabaseServicePool()
 database_registry = DatabaseServiceRegistry()
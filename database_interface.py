@@ -3,7 +3,7 @@ Abstract base class for database services to enable swappable implementations.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 
@@ -11,18 +11,24 @@ class DatabaseServiceInterface(ABC):
     """Abstract interface for database services."""
 
     @abstractmethod
-    def get_visitor_evidence_context(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Get visitor evidence context from vector search."""
+    def get_visitor_evidence_context(
+        self, query: str, limit: int = 5, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get visitor evidence context from vector search, reusing a precomputed query vector if given."""
         pass
 
     @abstractmethod
-    def get_policy_assertions(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
-        """Get policy assertions from vector search."""
+    def get_policy_assertions(
+        self, query: str, limit: int = 8, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get policy assertions from vector search, reusing a precomputed query vector if given."""
         pass
 
     @abstractmethod
-    def get_blog_assertions(self, query: str, limit: int = 18) -> List[Dict[str, Any]]:
-        """Get related blog assertions."""
+    def get_blog_assertions(
+        self, query: str, limit: int = 18, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get related blog assertions, reusing a precomputed query vector if given."""
         pass
 
     @abstractmethod
@@ -46,8 +52,10 @@ class DatabaseServiceInterface(ABC):
         pass
 
     @abstractmethod
-    def get_message_descriptions(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get message descriptions from vector search."""
+    def get_message_descriptions(
+        self, query: str, limit: int = 10, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get message descriptions from vector search, reusing a precomputed query vector if given."""
         pass
 
     @abstractmethod
@@ -4,7 +4,7 @@ This module provides a unified interface that can work with Astra DB or Azure Se
 """
 
 from database_factory import database_registry
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +24,15 @@ class DatabaseService:
             provider: Database provider ('astra' or 'azure'). If None, auto-detects.
             **kwargs: Additional configuration for the specific provider.
         """
-        self._service = database_registry.get_service(provider, **kwargs)
+        self._provider = provider
+        self._kwargs = kwargs
+        # Resolve once up front so configuration errors surface at start-up
+        database_registry.get_service(provider, **kwargs)
+
+    @property
+    def _service(self):
+        # Look the service up on each call so configuration changes reach long-lived instances
+        return database_registry.get_service(self._provider, **self._kwargs)
 
     def switch_provider(self, provider: str, **kwargs):
         """
@@ -34,7 +42,9 @@ class DatabaseService:
             provider: The new database provider to use.
             **kwargs: Additional configuration for the new provider.
         """
-        self._service = database_registry.switch_provider(provider, **kwargs)
+        database_registry.switch_provider(provider, **kwargs)
+        self._provider = provider
+        self._kwargs = kwargs
         logger.info(f"Database service switched to {provider}")
 
     def get_current_provider(self) -> str:
@@ -45,17 +55,23 @@ class DatabaseService:
         """Check if the database connection is healthy."""
         return self._service.health_check()
 
-    def get_visitor_evidence_context(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def get_visitor_evidence_context(
+        self, query: str, limit: int = 5, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Get visitor evidence context from vector search."""
-        return self._service.get_visitor_evidence_context(query, limit)
+        return self._service.get_visitor_evidence_context(query, limit, vector=vector)
 
-    def get_policy_assertions(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+    def get_policy_assertions(
+        self, query: str, limit: int = 8, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Get policy assertions from vector search."""
-        return self._service.get_policy_assertions(query, limit)
+        return self._service.get_policy_assertions(query, limit, vector=vector)
 
-    def get_blog_assertions(self, query: str, limit: int = 18) -> List[Dict[str, Any]]:
+    def get_blog_assertions(
+        self, query: str, limit: int = 18, vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """Get related blog assertions."""
-        return self._service.get_blog_assertions(query, limit)
+        return self._service.get_blog_assertions(query, limit, vector=vector)
 
 
 # Global service instance
@@ -0,0 +1,87 @@
+"""
+Per-request deadlines shared by retrieval and completion calls.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an operation is started after the request's time budget is spent."""
+
+
+class Deadline:
+    """A point in time by which the current request should have answered."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+# Context variables follow the request into worker threads that copy the caller's context
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds: Optional[float]) -> Optional[Deadline]:
+    """Start a deadline for the current request. None or 0 clears it."""
+    deadline = Deadline(seconds) if seconds else None
+    _current.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the current request's deadline, if any."""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run a block under a deadline, restoring the previous one afterwards."""
+    token = _current.set(Deadline(seconds) if seconds else None)
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None if it has no deadline."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def bound_timeout(timeout: Optional[float] = None, operation: str = "operation") -> Optional[float]:
+    """
+    Shorten a timeout so it ends no later than the request deadline.
+
+    Args:
+        timeout: The operation's own timeout in seconds. None means no limit of its own.
+        operation: Name used in the error message.
+
+    Returns:
+        The smaller of timeout and the time left, or timeout unchanged without a deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before {operation}")
+    return min(timeout, left) if timeout else left
+
+
+def bound_timeout_ms(timeout_ms: Optional[int] = None, operation: str = "operation") -> Optional[int]:
+    """Millisecond variant of bound_timeout for clients that take integer milliseconds."""
+    timeout = bound_timeout(timeout_ms / 1000.0 if timeout_ms else None, operation)
+    return max(1, int(timeout * 1000)) if timeout else None
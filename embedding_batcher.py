@@ -0,0 +1,117 @@
+"""
+Cross-request micro-batching of embedding calls.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into batched API calls.
+
+    Callers from any thread submit a single text and block on a future. A background
+    thread gathers whatever arrives within a short window (or until the batch is full),
+    sends one batched request, and fans the vectors back out to the waiting callers.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        window_ms: float = 5,
+        max_batch_size: int = 64,
+    ):
+        """
+        Args:
+            embed_batch: Function embedding a list of texts, returning vectors in the same order.
+            window_ms: How long to wait for further requests after the first one arrives.
+            max_batch_size: Maximum number of texts sent in one call.
+        """
+        self._embed_batch = embed_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "texts_sent": 0}
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding and return a future resolving to its vector."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        """Embed a single text through the coalescer, blocking until its batch completes."""
+        return self.submit(text).result(timeout=timeout)
+
+    def _ensure_started(self) -> None:
+        # The worker thread does not survive a fork, so restart it in each gunicorn worker
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        # This is the only consumer of the queue, so nothing may end the loop
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Batched embedding call for {len(batch)} requests failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch: list) -> None:
+        # Identical texts from concurrent requests share one slot in the call
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        vectors = list(self._embed_batch(texts))
+        if len(vectors) != len(texts):
+            raise ValueError(f"Embedding provider returned {len(vectors)} vectors for {len(texts)} texts")
+        by_text = dict(zip(texts, vectors))
+
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["texts_sent"] += len(texts)
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+    def stats(self) -> dict:
+        """Return request and batch counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["average_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,93 @@
+"""
+Two-tier cache for text embeddings: an in-memory LRU in front of a persistent SQLite store.
+"""
+
+import hashlib
+import threading
+import unicodedata
+from array import array
+from typing import List, Optional
+
+from cache_store import LRUCache, SqliteStore
+
+
+class EmbeddingCache:
+    """Cache of embedding vectors keyed on model and normalised text."""
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+        disk_max_entries: int = 100000,
+    ):
+        """
+        Args:
+            max_size: Entries kept in the in-memory tier.
+            ttl: Seconds an entry stays valid in either tier. None or 0 disables expiry.
+            path: SQLite file for the persistent tier. Empty or None disables it.
+            disk_max_entries: Entries kept in the persistent tier.
+        """
+        self._memory = LRUCache(max_size=max_size, ttl=ttl)
+        self._disk = SqliteStore(path, table="embeddings", max_entries=disk_max_entries, ttl=ttl) if path else None
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and apply Unicode NFC so trivially different inputs share an entry."""
+        return unicodedata.normalize("NFC", " ".join(text.split()))
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for already-normalised text."""
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached vector for normalised text, or None on a miss."""
+        key = self.make_key(model, text)
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._count("memory_hits")
+            return list(vector)
+
+        if self._disk is not None:
+            blob = self._disk.get(key)
+            if blob is not None:
+                vector = array("d")
+                vector.frombytes(blob)
+                self._memory.set(key, vector)
+                self._count("disk_hits")
+                return vector.tolist()
+
+        self._count("misses")
+        return None
+
+    def set(self, model: str, text: str, vector: List[float]) -> None:
+        """Store the vector for normalised text in both tiers."""
+        key = self.make_key(model, text)
+        packed = array("d", vector)
+        self._memory.set(key, packed)
+        if self._disk is not None:
+            self._disk.set(key, packed.tobytes())
+
+    def clear(self) -> None:
+        """Remove all cached vectors."""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current in-memory size."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self._memory)
+        stats["disk_enabled"] = self._disk is not None
+        return stats
@@ -0,0 +1,155 @@
+"""
+Hybrid retrieval across the vector stores and the knowledge graph with reciprocal-rank fusion.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import config
+from database_factory import database_pool
+from neo4j_handler import Neo4jHandler
+from openai_service import EmbeddingContext
+from retrieval_executor import retrieval_executor
+from semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+
+def _policy_assertions(query: str, vector: List[float], limit: int) -> List[Dict[str, Any]]:
+    return database_pool.get_service("astra").search_policy_assertions(query, limit=limit, vector=vector)
+
+
+def _visitor_evidence(query: str, vector: List[float], limit: int) -> List[Dict[str, Any]]:
+    return database_pool.get_service("astra").search_visitor_evidence(query, limit=limit, vector=vector)
+
+
+def _messages(query: str, vector: List[float], limit: int) -> List[Dict[str, Any]]:
+    return database_pool.get_service("azure").search_messages(query, limit=limit, vector=vector)
+
+
+def _graph_relationships(query: str, vector: List[float], limit: int) -> List[Dict[str, Any]]:
+    rows = Neo4jHandler().graph_rag(query, vector=vector, top_k=config.graph_rag_top_k, expand_limit=limit)
+    return [dict(row, id=f"{row.get('n.name')}|{row.get('r.Relationship')}|{row.get('m.name')}") for row in rows]
+
+
+# Each source takes (query, vector, limit) and returns documents ranked most relevant first.
+# Sources raise on failure rather than returning nothing, so the retriever can report them missing.
+SOURCES: Dict[str, Callable[[str, List[float], int], List[Dict[str, Any]]]] = {
+    "astra:policy_assertions": _policy_assertions,
+    "astra:visitor_evidence": _visitor_evidence,
+    "azure:messages": _messages,
+    "graph": _graph_relationships,
+}
+
+
+def document_key(document: Dict[str, Any]) -> str:
+    """Identify a document across sources by its id, or by its content when it has none."""
+    identifier = document.get("_id") or document.get("id")
+    return str(identifier) if identifier else SemanticCache.fingerprint([document])
+
+
+def json_safe(value: Any) -> Any:
+    """Convert a document value to JSON types, rendering driver-specific types such as ids and dates as strings."""
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Args:
+        rankings: Mapping of source name to its documents, most relevant first.
+        k: Smoothing constant; larger values flatten the advantage of top ranks.
+
+    Returns:
+        Fused results, best first, as {"document", "score", "sources"} dicts. Documents returned by
+        several sources are merged and score the sum of their reciprocal ranks.
+    """
+    fused = {}
+    for source, documents in rankings.items():
+        for rank, document in enumerate(documents, start=1):
+            key = document_key(document)
+            entry = fused.setdefault(key, {"document": document, "score": 0.0, "sources": []})
+            entry["score"] += 1.0 / (k + rank)
+            if source not in entry["sources"]:
+                entry["sources"].append(source)
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+
+class HybridRetriever:
+    """Queries several retrieval sources concurrently under one deadline and fuses what arrives in time."""
+
+    def __init__(self, sources: Dict[str, Callable] = None, default_sources: List[str] = None, k: int = 60):
+        """
+        Args:
+            sources: Mapping of source name to a (query, vector, limit) lookup. Defaults to SOURCES.
+            default_sources: Names queried when a request does not choose. Defaults to all sources.
+            k: Reciprocal-rank fusion constant.
+        """
+        self.sources = sources if sources is not None else SOURCES
+        self.default_sources = default_sources or list(self.sources)
+        self.k = k
+
+    def retrieve(
+        self,
+        query: str,
+        limit: int = 10,
+        sources: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        embeddings: Optional[EmbeddingContext] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the query against the selected sources and fuse the results.
+
+        Args:
+            query: Search text.
+            limit: Results requested from each source and returned after fusion.
+            sources: Source names to query. Defaults to the retriever's default sources.
+            timeout: Seconds to wait for the sources. Defaults to RETRIEVAL_TIMEOUT.
+            embeddings: Request embedding memo, so callers can share the query vector.
+
+        Returns:
+            {"results": fused results, "sources": result counts by source, "missing": sources that
+            failed or missed the deadline, "elapsed": seconds}.
+
+        Raises:
+            ValueError: If a named source is not registered.
+        """
+        started = time.monotonic()
+        names = list(sources or self.default_sources)
+        unknown = [name for name in names if name not in self.sources]
+        if unknown:
+            raise ValueError(f"Unknown sources: {', '.join(unknown)}. Available: {', '.join(self.sources)}")
+        vector = (embeddings or EmbeddingContext()).get(query)
+
+        results = retrieval_executor.run(
+            {name: (lambda name=name: self.sources[name](query, vector, limit)) for name in names},
+            timeout=timeout,
+            fallback=lambda: None,
+        )
+        rankings = {name: list(documents) for name, documents in results.items() if documents is not None}
+        missing = [name for name, documents in results.items() if documents is None]
+
+        fused = reciprocal_rank_fusion(rankings, k=self.k)[:limit]
+        for entry in fused:
+            entry["document"] = {key: value for key, value in entry["document"].items() if key != "$vector"}
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Hybrid retrieval over {names} fused {len(fused)} results in {elapsed:.3f}s, missing {missing}")
+        return {
+            "results": fused,
+            "sources": {name: len(documents) for name, documents in rankings.items()},
+            "missing": missing,
+            "elapsed": round(elapsed, 3),
+        }
+
+
+# Global retriever instance
+hybrid_retriever = HybridRetriever(default_sources=config.hybrid_sources, k=config.hybrid_rrf_k)
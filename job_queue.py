@@ -0,0 +1,231 @@
+"""
+In-process background job queue for long-running maintenance operations.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from cache_store import SqliteStore
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A queued unit of work with status and progress reporting."""
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = "queued"
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Process running the job and when it last reported being alive (wall-clock seconds)
+        self.owner = os.getpid()
+        self.heartbeat_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable view of the job."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total, "message": self.message},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "owner": self.owner,
+            "heartbeat_at": self.heartbeat_at,
+        }
+
+
+class JobQueue:
+    """
+    Runs submitted functions on background worker threads.
+
+    Each function is called with a ``progress(done, total=None, message="")`` keyword
+    argument it can use to report how far it has got. Job state is optionally mirrored to
+    SQLite so any gunicorn worker can answer status requests for jobs run by another.
+
+    Unfinished jobs carry the owning pid and a heartbeat refreshed while their worker thread
+    is alive. A job whose heartbeat is older than stale_after is reported as failed, so a job
+    lost with its thread or process does not appear to be running forever.
+    """
+
+    # Finished jobs kept in memory per process
+    MAX_FINISHED = 200
+
+    def __init__(
+        self,
+        workers: int = 2,
+        path: Optional[str] = None,
+        retention: float = 7 * 24 * 3600,
+        heartbeat_interval: float = 5.0,
+        stale_after: float = 60.0,
+    ):
+        """
+        Args:
+            workers: Number of worker threads per process.
+            path: SQLite file used to share job state between processes. None keeps it in memory.
+            retention: Seconds finished jobs remain queryable from the store.
+            heartbeat_interval: Seconds between heartbeats for unfinished jobs.
+            stale_after: Seconds without a heartbeat after which an unfinished job is failed.
+        """
+        self.workers = max(1, int(workers))
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._store = SqliteStore(path, table="jobs", ttl=retention) if path else None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._running = {}
+        self._pid = None
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs) -> Job:
+        """Queue fn(*args, progress=..., **kwargs) to run in the background and return its job."""
+        self._ensure_started()
+        job = Job(name)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._save(job)
+        self._queue.put((job, fn, args, kwargs))
+        logger.info(f"Queued job {job.id} ({name})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the state of a job, looking in the shared store if this process did not run it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            state = job.to_dict() if job is not None else None
+        if state is None and self._store is not None:
+            blob = self._store.get(job_id)
+            if blob is not None:
+                state = json.loads(blob)
+        if state is not None and self._is_stale(state):
+            state = self._mark_lost(job, state)
+        return state
+
+    def _is_stale(self, state: Dict[str, Any]) -> bool:
+        heartbeat_at = state.get("heartbeat_at") or state["created_at"]
+        return state["finished_at"] is None and time.time() - heartbeat_at > self.stale_after
+
+    def _mark_lost(self, job: Optional[Job], state: Dict[str, Any]) -> Dict[str, Any]:
+        # The owning thread or process stopped heartbeating, so the job will never finish
+        error = f"The job stopped reporting progress; worker process {state.get('owner')} is gone."
+        logger.warning(f"Job {state['id']} ({state['name']}) is stale, marking it failed")
+        state = dict(state, status="failed", error=error, finished_at=time.time())
+        if job is not None:
+            job.status, job.error, job.finished_at = "failed", error, state["finished_at"]
+        if self._store is not None:
+            self._store.set(state["id"], json.dumps(state, default=str).encode("utf-8"))
+        return state
+
+    def _prune(self) -> None:
+        # Keep only the most recent finished jobs in memory; the store keeps the rest
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        for job in sorted(finished, key=lambda job: job.finished_at)[: max(0, len(finished) - self.MAX_FINISHED)]:
+            del self._jobs[job.id]
+
+    def _ensure_started(self) -> None:
+        # Worker threads do not survive a fork, so start them in each gunicorn worker
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                workers_alive = any(thread.is_alive() for thread in self._threads)
+                jobs = [
+                    job
+                    for job in self._jobs.values()
+                    if job.finished_at is None
+                    # Running jobs need their own thread; queued jobs need any worker left to run them
+                    and (self._running.get(job.id).is_alive() if job.id in self._running else workers_alive)
+                ]
+            for job in jobs:
+                job.heartbeat_at = time.time()
+                self._save(job)
+
+    def _save(self, job: Job) -> None:
+        if self._store is not None:
+            self._store.set(job.id, json.dumps(job.to_dict(), default=str).encode("utf-8"))
+
+    def _run(self) -> None:
+        while True:
+            job, fn, args, kwargs = self._queue.get()
+            last_saved = [0.0]
+
+            def progress(done: int, total: int = None, message: str = "") -> None:
+                job.done = done
+                if total is not None:
+                    job.total = total
+                job.message = message
+                job.heartbeat_at = time.time()
+                # Mirror progress to the shared store at most once a second
+                if time.monotonic() - last_saved[0] >= 1:
+                    last_saved[0] = time.monotonic()
+                    self._save(job)
+
+            with self._lock:
+                self._running[job.id] = threading.current_thread()
+            job.status = "running"
+            job.started_at = job.heartbeat_at = time.time()
+            self._save(job)
+            try:
+                result = fn(*args, progress=progress, **kwargs)
+                job.result = result
+                if result is False:
+                    job.status = "failed"
+                    job.error = "The operation reported a failure; see the server logs for details."
+                elif isinstance(result, dict) and result.get("failed"):
+                    # Some items failed; the per-item details are in the result report
+                    job.status = "partial"
+                    job.error = f"{result['failed']} items failed; see the result for details."
+                else:
+                    job.status = "completed"
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.name}) failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = time.time()
+            with self._lock:
+                self._running.pop(job.id, None)
+            self._save(job)
+            logger.info(f"Job {job.id} ({job.name}) {job.status}")
+
+
+# Global queue instance
+job_queue = JobQueue(
+    workers=config.job_workers,
+    path=config.job_store_path,
+    heartbeat_interval=config.job_heartbeat_interval,
+    stale_after=config.job_stale_after,
+)
@@ -1,18 +1,149 @@
-import neo4j
+import logging
 import os
+import threading
+
+import neo4j
+
+from config import config
+from deadline import bound_timeout
+
+logger = logging.getLogger(__name__)
+
+# Relationship search followed by expansion to every relationship among the matched nodes.
+# {search} is the vector index lookup and {limit} an optional cap on returned relationships.
+GRAPH_RAG_QUERY = """
+        {search}
+        YIELD relationship AS rel, score
+        WITH collect(DISTINCT startNode(rel)) + collect(DISTINCT endNode(rel)) AS nodes
+
+        UNWIND nodes AS node
+        WITH collect(DISTINCT node) AS distinctNodes
+
+        MATCH (n)-[r]->(m)
+        WHERE n IN distinctNodes AND m IN distinctNodes
+        RETURN DISTINCT n.name, r.Relationship, m.name, r.Criticality, r.`Evidence base`
+        {limit}
+        """
+
+# The database server embeds the search term itself, making its own OpenAI call
+SERVER_EMBEDDING_SEARCH = """WITH genai.vector.encode($searchTerm, 'OpenAI', { token: $token }) AS embedding2Search
+        CALL db.index.vector.queryRelationships('z', $topK, embedding2Search)"""
+
+# The application supplies the embedding, so it can come from the shared embedding cache
+VECTOR_SEARCH = "CALL db.index.vector.queryRelationships('z', $topK, $embedding)"
+
+
+def graph_rag_statement(searchterm, vector=None, top_k=10, expand_limit=None):
+    """
+    Build the graph RAG query and its parameters.
+
+    Args:
+        searchterm: Text to search for. Embedded by the database when no vector is given.
+        vector: Precomputed embedding of the search term (text-embedding-ada-002).
+        top_k: Relationships taken from the vector index.
+        expand_limit: Maximum relationships returned after expansion. None returns them all.
+
+    Returns:
+        A (query, parameters) tuple.
+    """
+    parameters = {"topK": int(top_k)}
+    if vector is not None:
+        search = VECTOR_SEARCH
+        parameters["embedding"] = list(vector)
+    else:
+        search = SERVER_EMBEDDING_SEARCH
+        parameters.update({"searchTerm": searchterm, "token": os.getenv("NEO4J_OPENAI_TOKEN")})
+
+    limit = ""
+    if expand_limit:
+        limit = "LIMIT $expandLimit"
+        parameters["expandLimit"] = int(expand_limit)
+
+    return GRAPH_RAG_QUERY.format(search=search, limit=limit), parameters
+
+
+# Process-wide drivers, each holding its own Bolt connection pool
+_lock = threading.Lock()
+_driver = None
+_async_driver = None
+_pid = None
+
+
+def _driver_settings():
+    return {
+        "auth": ("neo4j", os.getenv("NEO4JPASSWORD")),
+        "max_connection_pool_size": config.neo4j_max_pool_size,
+        "connection_acquisition_timeout": config.neo4j_connection_acquisition_timeout,
+        "liveness_check_timeout": config.neo4j_liveness_check_timeout,
+        "max_connection_lifetime": config.neo4j_max_connection_lifetime,
+    }
+
+
+def _reset_after_fork():
+    # Bolt sockets cannot be shared with a forked gunicorn worker, so drop the parent's drivers
+    global _driver, _async_driver, _pid
+    if _pid != os.getpid():
+        _driver = None
+        _async_driver = None
+        _pid = os.getpid()
+
+
+def get_driver():
+    """Return the shared synchronous driver, creating it on first use."""
+    global _driver
+    with _lock:
+        _reset_after_fork()
+        if _driver is None:
+            _driver = neo4j.GraphDatabase.driver(os.getenv("NEO4JURL"), **_driver_settings())
+            logger.info(f"Created Neo4j driver (pool size {config.neo4j_max_pool_size})")
+        return _driver
+
+
+def get_async_driver():
+    """Return the shared asyncio driver, creating it on first use. Use it from a single event loop."""
+    global _async_driver
+    with _lock:
+        _reset_after_fork()
+        if _async_driver is None:
+            _async_driver = neo4j.AsyncGraphDatabase.driver(os.getenv("NEO4JURL"), **_driver_settings())
+            logger.info(f"Created async Neo4j driver (pool size {config.neo4j_max_pool_size})")
+        return _async_driver
+
+
+def close_driver():
+    """Close the shared synchronous driver. The async driver must be closed with close_async_driver."""
+    global _driver
+    with _lock:
+        if _driver is not None and _pid == os.getpid():
+            try:
+                _driver.close()
+            except Exception as e:
+                logger.warning(f"Error closing Neo4j driver: {e}")
+        _driver = None
+
+
+async def close_async_driver():
+    """Close the shared asyncio driver from the event loop that used it."""
+    global _async_driver
+    with _lock:
+        driver, _async_driver = _async_driver, None
+    if driver is not None:
+        await driver.close()
 
 
 class Neo4jHandler:
-    def __init__(self):
+    """
+    Runs queries on the process-wide pooled driver.
+
+    Handlers are cheap and need no closing; the shared driver is closed once at shutdown
+    by close_driver (or close_async_driver for the asyncio driver).
+    """
+
+    def __init__(self, driver=None):
         self.uri = os.getenv("NEO4JURL")
         self.user = "neo4j"
         self.password = os.getenv("NEO4JPASSWORD")
-        self.driver = neo4j.GraphDatabase.driver(
-            self.uri, auth=(self.user, self.password)
-        )
-
-    def close(self):
-        self.driver.close()
+        self.driver = driver or get_driver()
 
     def query(self, query, parameters=None, db="neo4j"):
         with self.driver.session(database=db) as session:
@@ -24,26 +155,21 @@ class Neo4jHandler:
             result = session.run(query, parameters)
             return [dict(record) for record in result]
 
-    def graph_rag(self, searchterm, parameters=None, db="neo4j"):
-
-        token = os.getenv("NEO4J_OPENAI_TOKEN")
-
-        query = """
-                WITH genai.vector.encode($searchTerm, 'OpenAI', { token: $token }) AS embedding2Search
-                CALL db.index.vector.queryRelationships('z',10,embedding2Search)
-                YIELD relationship AS rel, score
-                WITH collect(DISTINCT startNode(rel)) + collect(DISTINCT endNode(rel)) AS nodes
+    def graph_rag(self, searchterm, parameters=None, db="neo4j", vector=None, top_k=10, expand_limit=None):
+        """Run the graph RAG query, using a precomputed embedding when one is given."""
+        query, parameters = graph_rag_statement(searchterm, vector, top_k, expand_limit)
 
-                UNWIND nodes AS node
-                WITH collect(DISTINCT node) AS distinctNodes
-
-                MATCH (n)-[r]->(m)
-                WHERE n IN distinctNodes AND m IN distinctNodes
-                RETURN DISTINCT n.name, r.Relationship, m.name, r.Criticality, r.`Evidence base`
-                """
-
-        parameters = {"searchTerm": searchterm, "token": token}
+        # The transaction timeout keeps the server from working past the request deadline
+        timeout = bound_timeout(operation="graph query")
 
         with self.driver.session(database=db) as session:
-            result = session.run(query, parameters)
+            result = session.run(neo4j.Query(query, timeout=timeout), parameters)
             return result.data()
+
+    async def graph_rag_async(self, searchterm, db="neo4j", vector=None, top_k=10, expand_limit=None):
+        """Run the graph RAG query on the shared asyncio driver."""
+        query, parameters = graph_rag_statement(searchterm, vector, top_k, expand_limit)
+
+        async with get_async_driver().session(database=db) as session:
+            result = await session.run(query, parameters)
+            return await result.data()
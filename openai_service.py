@@ -3,8 +3,55 @@ OpenAI client management and embedding generation.
 """
 
 import os
+import threading
+import time
+import openai
 from openai import OpenAI
 from config import config
+from deadline import DeadlineExceeded, bound_timeout, current_deadline
+from completion_cache import CompletionCache, MemoryCompletionBackend, SqliteCompletionBackend
+from embedding_cache import EmbeddingCache
+from embedding_batcher import EmbeddingBatcher
+from rate_limiter import RateLimiter
+from task_stats import TaskStats
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Maximum number of inputs the embeddings endpoint accepts in one request
+MAX_EMBEDDING_INPUTS = 2048
+
+# Completion tokens assumed when budgeting a chat request that sets no max_tokens
+DEFAULT_COMPLETION_ALLOWANCE = 512
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token) for rate budgeting."""
+    return len(text) // 4 + 1
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Return True for throttling, timeouts, connection failures and server errors."""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: Exception) -> float:
+    """Return the delay requested by the server's Retry-After headers, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
 
 
 class OpenAIService:
@@ -12,6 +59,43 @@ class OpenAIService:
 
     def __init__(self):
         self._client = None
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=config.openai_requests_per_minute,
+            tokens_per_minute=config.openai_tokens_per_minute,
+            max_concurrency=config.openai_max_concurrency,
+            max_retries=config.openai_max_retries,
+            base_delay=config.openai_backoff_base,
+            max_delay=config.openai_backoff_max,
+            is_retryable=is_retryable_error,
+            retry_after=retry_after_seconds,
+            is_throttled=lambda e: isinstance(e, openai.RateLimitError),
+        )
+        self.embedding_cache = EmbeddingCache(
+            max_size=config.embedding_cache_size,
+            ttl=config.embedding_cache_ttl,
+            path=config.embedding_cache_path,
+            disk_max_entries=config.embedding_cache_disk_entries,
+        )
+        completion_backends = [
+            MemoryCompletionBackend(max_size=config.completion_cache_size, ttl=config.completion_cache_ttl)
+        ]
+        if config.completion_cache_path:
+            completion_backends.append(
+                SqliteCompletionBackend(
+                    config.completion_cache_path,
+                    max_entries=config.completion_cache_disk_entries,
+                    ttl=config.completion_cache_ttl,
+                )
+            )
+        self.completion_cache = CompletionCache(completion_backends)
+        self.task_stats = TaskStats(prices=config.model_prices)
+        self.embedding_batcher = None
+        if config.embedding_batch_window_ms > 0:
+            self.embedding_batcher = EmbeddingBatcher(
+                self._create_embeddings,
+                window_ms=config.embedding_batch_window_ms,
+                max_batch_size=config.embedding_batch_max_size,
+            )
 
     def get_client(self) -> OpenAI:
         """Get or create OpenAI client."""
@@ -22,24 +106,222 @@ class OpenAIService:
             else:
                 print("Warning: OPENAI_API_KEY environment variable is not set.")
 
-            self._client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+            # Retries are handled by the rate limiter so they respect the shared budgets
+            self._client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
 
         return self._client
 
+    @staticmethod
+    def _estimate_chat_tokens(messages: list, max_tokens: int = None) -> int:
+        """Estimate prompt plus completion tokens for budgeting a chat request."""
+        prompt = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+        return prompt + (max_tokens or DEFAULT_COMPLETION_ALLOWANCE)
+
+    def _create_embeddings(self, texts: list) -> list:
+        """Call the embeddings API for a list of texts, returning vectors in input order."""
+        client = self.get_client()
+        vectors = []
+        for start in range(0, len(texts), MAX_EMBEDDING_INPUTS):
+            chunk = texts[start : start + MAX_EMBEDDING_INPUTS]
+            timeout = bound_timeout(None, "embedding")
+            options = {"timeout": timeout} if timeout else {}
+            embeddings = self.rate_limiter.call(
+                lambda: client.embeddings.create(model=EMBEDDING_MODEL, input=chunk, **options),
+                estimated_tokens=sum(estimate_tokens(text) for text in chunk),
+            )
+            vectors.extend(item.embedding for item in sorted(embeddings.data, key=lambda item: item.index))
+        return vectors
+
     def get_embeddings(self, query: str) -> list:
-        """Generate embeddings for a query."""
+        """Generate embeddings for a query, serving repeated text from the embedding cache."""
+        text = EmbeddingCache.normalize(query)
+        cached = self.embedding_cache.get(EMBEDDING_MODEL, text)
+        if cached is not None:
+            return cached
+
+        # Concurrent requests are coalesced into one batched call when batching is enabled
+        if self.embedding_batcher is not None:
+            embedding = self.embedding_batcher.embed(text, timeout=bound_timeout(None, "embedding"))
+        else:
+            embedding = self._create_embeddings([text])[0]
+        self.embedding_cache.set(EMBEDDING_MODEL, text, embedding)
+        return embedding
+
+    def get_embeddings_batch(self, queries: list) -> list:
+        """Generate embeddings for several queries with one API call for all cache misses."""
+        texts = [EmbeddingCache.normalize(query) for query in queries]
+        vectors = {}
+        for text in texts:
+            if text not in vectors:
+                vectors[text] = self.embedding_cache.get(EMBEDDING_MODEL, text)
+
+        missing = [text for text, vector in vectors.items() if vector is None]
+        if missing:
+            for text, embedding in zip(missing, self._create_embeddings(missing)):
+                self.embedding_cache.set(EMBEDDING_MODEL, text, embedding)
+                vectors[text] = embedding
+
+        return [vectors[text] for text in texts]
+
+    @staticmethod
+    def _raise_if_deadline_passed(error: Exception, task: str) -> None:
+        """Report a timeout caused by the request deadline as DeadlineExceeded."""
+        deadline = current_deadline()
+        if isinstance(error, openai.APITimeoutError) and deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"Request deadline exceeded during {task} completion") from error
+
+    @staticmethod
+    def _route(task: str, model: str, timeout: float) -> tuple:
+        """Resolve the model, sampling parameters and timeout for a task from the routing table."""
+        route = config.task_route(task)
+        params = {name: route[name] for name in ("max_tokens", "temperature") if route.get(name) is not None}
+        return model or route["model"], params, timeout or route.get("timeout")
+
+    def generate_completion(
+        self,
+        messages: list,
+        model: str = None,
+        timeout: float = None,
+        cache: bool = False,
+        task: str = None,
+    ) -> str:
+        """
+        Generate a chat completion, optionally bounded by a request timeout in seconds.
+
+        The task name selects the model, max_tokens, temperature and timeout from the routing
+        table in config.py; an explicit model or timeout takes precedence. Set cache=True for
+        idempotent prompts (summaries, tags) so identical requests are answered from the
+        completion cache.
+
+        The timeout is shortened to fit the request deadline, if one is set.
+        """
+        task = task or "default"
+        model, params, timeout = self._route(task, model, timeout)
+
+        key = None
+        if cache:
+            key = CompletionCache.make_key(model, messages, params)
+            cached = self.completion_cache.get(key)
+            if cached is not None:
+                return cached
+
         client = self.get_client()
-        embeddings = client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=[query],
+        timeout = bound_timeout(timeout, f"{task} completion")
+        options = {"timeout": timeout} if timeout else {}
+        started = time.monotonic()
+        try:
+            chat_completion = self.rate_limiter.call(
+                lambda: client.chat.completions.create(messages=messages, model=model, **params, **options),
+                estimated_tokens=self._estimate_chat_tokens(messages, params.get("max_tokens")),
+            )
+        except Exception as e:
+            self.task_stats.record(task, model, time.monotonic() - started, error=e)
+            self._raise_if_deadline_passed(e, task)
+            raise
+
+        usage = chat_completion.usage
+        self.task_stats.record(
+            task,
+            model,
+            time.monotonic() - started,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
         )
-        return embeddings.data[0].embedding
+        text = chat_completion.choices[0].message.content
+        if key is not None and text:
+            self.completion_cache.set(key, text)
+        return text
+
+    def stream_completion(self, messages: list, model: str = None, timeout: float = None, task: str = None):
+        """Generate a chat completion as a stream of text fragments, routed by task like generate_completion."""
+        task = task or "default"
+        model, params, timeout = self._route(task, model, timeout)
 
-    def generate_completion(self, messages: list, model: str = "gpt-4o") -> str:
-        """Generate a chat completion."""
         client = self.get_client()
-        chat_completion = client.chat.completions.create(messages=messages, model=model)
-        return chat_completion.choices[0].message.content
+        timeout = bound_timeout(timeout, f"{task} completion")
+        options = {"timeout": timeout} if timeout else {}
+        started = time.monotonic()
+        usage = None
+        error = None
+        cancelled = False
+        try:
+            # Budgets and retries apply to opening the stream
+            stream = self.rate_limiter.call(
+                lambda: client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **params,
+                    **options,
+                ),
+                estimated_tokens=self._estimate_chat_tokens(messages, params.get("max_tokens")),
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except GeneratorExit:
+            # The consumer stopped reading, e.g. the client disconnected mid-stream
+            cancelled = True
+            raise
+        except Exception as e:
+            error = e
+            self._raise_if_deadline_passed(e, task)
+            raise
+        finally:
+            self.task_stats.record(
+                task,
+                model,
+                time.monotonic() - started,
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+                error=error,
+                cancelled=cancelled,
+            )
+
+
+class EmbeddingContext:
+    """
+    Request-scoped memo of query embeddings.
+
+    Create one per request and pass its vectors to every retrieval, so a request that
+    searches several collections embeds each distinct text exactly once.
+    """
+
+    def __init__(self, service: OpenAIService = None):
+        self._service = service
+        self._lock = threading.Lock()
+        self._vectors = {}
+
+    @property
+    def service(self) -> OpenAIService:
+        return self._service or openai_service
+
+    def get(self, text: str) -> list:
+        """Return the embedding for text, computing it on first use."""
+        key = EmbeddingCache.normalize(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+        if vector is None:
+            vector = self.service.get_embeddings(text)
+            with self._lock:
+                vector = self._vectors.setdefault(key, vector)
+        return vector
+
+    def get_many(self, texts: list) -> list:
+        """Return embeddings for several texts, fetching all unseen ones in one batch."""
+        keys = [EmbeddingCache.normalize(text) for text in texts]
+        with self._lock:
+            missing = list(dict.fromkeys(key for key in keys if key not in self._vectors))
+        if missing:
+            vectors = self.service.get_embeddings_batch(missing)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self._vectors.setdefault(key, vector)
+        with self._lock:
+            return [self._vectors[key] for key in keys]
 
 
 # Global service instance
@@ -3,33 +3,171 @@ Query processing services for different types of queries.
 """
 
 import ast
-from typing import List, Dict, Any
-from openai_service import openai_service
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional
+from config import config
+from context_packer import POLICY_FIELDS, context_packer
+from deadline import bound_timeout, remaining
+from openai_service import openai_service, EmbeddingContext
 from database_service import database_service
+from retrieval_executor import retrieval_executor
+from semantic_cache import SemanticCache, VOLATILE_FIELDS, semantic_cache
+from streaming import sse_event, stream_markdown
 from text_formatter import text_formatter
 from neo4j_handler import Neo4jHandler
 
+logger = logging.getLogger(__name__)
+
 
 class QueryService:
     """Service for processing different types of queries."""
 
-    def get_visitor_context(self, query: str) -> str:
+    EVIDENCE_SUMMARY_UNAVAILABLE = "Evidence summary unavailable."
+
+    def __init__(self):
+        # Shared pool for completions that can run side by side within a request
+        self._executor = ThreadPoolExecutor(max_workers=config.llm_max_workers, thread_name_prefix="llm")
+
+    def _submit(self, fn: Callable, *args, **kwargs):
+        """Run fn on the completion pool, carrying the request deadline into the worker thread."""
+        return self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    @staticmethod
+    def _time_for_evidence_summary() -> bool:
+        """Return False when the request deadline leaves too little time for the evidence summary."""
+        left = remaining()
+        if left is not None and left < config.deadline_evidence_summary_min:
+            logger.warning(f"Skipping evidence summary with {left:.1f}s of the request deadline left")
+            return False
+        return True
+
+    def get_visitor_context(self, query: str, embeddings: EmbeddingContext = None) -> str:
         """Get visitor evidence context for a query."""
-        vector_context = database_service.get_visitor_evidence_context(query)
-        formatted_context = text_formatter.format_context_items(vector_context, "visitor_evidence")
+        return self._format_visitor_context(self._visitor_documents(query, embeddings or EmbeddingContext()))
+
+    @staticmethod
+    def _query_vector(query: str, embeddings: EmbeddingContext) -> Optional[List[float]]:
+        """Embed the query through the request memo, returning None if embedding fails."""
+        try:
+            return embeddings.get(query)
+        except Exception as e:
+            logger.error(f"Error embedding query: {e}")
+            return None
+
+    def _visitor_documents(self, query: str, embeddings: EmbeddingContext) -> List[Dict[str, Any]]:
+        """Retrieve visitor evidence documents for a query."""
+        # Without a vector the service embeds the query itself, inside its own error handling
+        return database_service.get_visitor_evidence_context(query, vector=self._query_vector(query, embeddings))
+
+    @staticmethod
+    def _pack_formatted(documents: List[Dict[str, Any]], format_type: str, budget_name: str) -> str:
+        """Format the highest-ranked documents that fit the prompt's token budget."""
+        documents, _ = context_packer.select(
+            documents,
+            config.context_budget(budget_name),
+            lambda document: text_formatter.format_context_items([document], format_type),
+            budget_name,
+        )
+        return text_formatter.format_context_items(documents, format_type)
+
+    def _format_visitor_context(self, documents: List[Dict[str, Any]]) -> str:
+        formatted_context = self._pack_formatted(documents, "visitor_evidence", "visitor_evidence")
 
         context = f"Evidence base:\n{formatted_context}\n\n"
         return context
 
-    def get_graph_context(self, query: str) -> str:
-        """Get graph context using Neo4j."""
-        neo4j_handler = Neo4jHandler()
-        result = neo4j_handler.graph_rag(query)
-        neo4j_handler.close()
+    def _cache_key(self, query: str, embeddings: EmbeddingContext, documents: list, use_cache: bool):
+        """Return the semantic cache key for a request, or None if caching does not apply."""
+        if not (use_cache and config.semantic_cache_enabled):
+            return None
+        vector = self._query_vector(query, embeddings)
+        if vector is None:
+            return None
+        return vector, SemanticCache.fingerprint(documents)
+
+    def _cached_answer(
+        self,
+        endpoint: str,
+        query: str,
+        embeddings: EmbeddingContext,
+        documents: list,
+        produce: Callable[[], str],
+        use_cache: bool = True,
+        cacheable: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """Return a semantically cached answer for the request, or produce and cache a new one."""
+        key = self._cache_key(query, embeddings, documents, use_cache)
+        if key is None:
+            return produce()
+
+        cached = semantic_cache.lookup(endpoint, *key)
+        if cached is not None:
+            return cached
+
+        html = produce()
+        if cacheable is None or cacheable(html):
+            semantic_cache.store(endpoint, *key, html)
+        return html
+
+    def _stream(
+        self,
+        endpoint: str,
+        query: str,
+        embeddings: EmbeddingContext,
+        documents: list,
+        messages: list,
+        use_cache: bool = True,
+        render: Callable[[str], str] = None,
+        finish: Callable[[str], str] = None,
+        cacheable: Optional[Callable[[str], bool]] = None,
+        on_miss: Optional[Callable[[], None]] = None,
+        timeout: float = None,
+        task: str = None,
+    ):
+        """
+        Stream a completion as server-sent events, serving a cached answer as a single event.
+
+        on_miss is called before streaming starts when no cached answer exists, so callers can
+        begin any side work (such as a concurrent summary) only when it will be used.
+        """
+        key = self._cache_key(query, embeddings, documents, use_cache)
+        if key is not None:
+            cached = semantic_cache.lookup(endpoint, *key)
+            if cached is not None:
+                return iter([sse_event("done", {"html": cached})])
+
+        if on_miss is not None:
+            on_miss()
+
+        render = render or text_formatter.format_to_html
+        finish = finish or render
+
+        def finish_and_store(text: str) -> str:
+            html = finish(text)
+            if key is not None and (cacheable is None or cacheable(html)):
+                semantic_cache.store(endpoint, *key, html)
+            return html
+
+        return stream_markdown(
+            openai_service.stream_completion(messages, timeout=timeout, task=task),
+            render=render,
+            finish=finish_and_store,
+        )
+
+    def get_graph_context(self, query: str, vector: Optional[List[float]] = None) -> str:
+        """Get graph context using Neo4j, embedding the query through the shared embedding cache."""
+        if vector is None:
+            vector = openai_service.get_embeddings(query)
+        result = Neo4jHandler().graph_rag(
+            query, vector=vector, top_k=config.graph_rag_top_k, expand_limit=config.graph_rag_expand_limit or None
+        )
 
         return text_formatter.format_graph_results(result)
 
-    def get_evidence_summary(self, context: str) -> str:
+    def get_evidence_summary(self, context: str, timeout: float = None) -> str:
         """Generate a summary of evidence sources."""
         question = (
             "Please provide a high level summary of the nature of the evidence sources "
@@ -39,7 +177,7 @@ class QueryService:
         )
 
         messages = [{"role": "user", "content": question}]
-        return openai_service.generate_completion(messages)
+        return openai_service.generate_completion(messages, timeout=timeout, cache=True, task="evidence_summary")
 
     def summarise_message(self, message: str) -> str:
         """Summarise a message for clarity."""
@@ -49,10 +187,10 @@ class QueryService:
         ).format(message=message)
 
         messages = [{"role": "user", "content": question}]
-        return openai_service.generate_completion(messages)
+        return openai_service.generate_completion(messages, cache=True, task="summarise_message")
 
-    def process_visitor_query(self, query: str) -> str:
-        """Process a visitor-focused query."""
+    def _visitor_messages(self, query: str, embeddings: EmbeddingContext) -> tuple:
+        """Build the visitor analysis prompt, returning the messages, formatted context and documents."""
         question = (
             "Review the context and provide a concise, integrated, neutral and "
             "balanced response to the Query, strictly adhering to the context provided, "
@@ -60,13 +198,24 @@ class QueryService:
             f"Limit your response to 300 words, using UK English:\n\nQuery: {query}"
         )
 
-        context = self.get_visitor_context(query)
+        documents = self._visitor_documents(query, embeddings)
+        context = self._format_visitor_context(documents)
         prompt = f"{question}\n\nAssertions:{context}"
 
-        messages = [{"role": "user", "content": prompt}]
-        text = openai_service.generate_completion(messages)
+        return [{"role": "user", "content": prompt}], context, documents
+
+    def _await_evidence_summary(self, summary_future, timeout: float) -> str:
+        """Wait for a concurrently running evidence summary, degrading to a placeholder."""
+        try:
+            return summary_future.result(timeout=max(0.0, timeout))
+        except Exception as e:
+            logger.warning(f"Evidence summary unavailable: {e}")
+            summary_future.cancel()
+            return self.EVIDENCE_SUMMARY_UNAVAILABLE
 
-        evidence_summary = self.get_evidence_summary(context)
+    @staticmethod
+    def _visitor_response(text: str, evidence_summary: str, context: str) -> str:
+        """Assemble the visitor analysis, evidence summary and sources into one HTML document."""
         full_response = (
             f"<div class='analysis-section'>"
             f"<h2 class='text-xl font-bold'>Analysis</h2>"
@@ -84,8 +233,73 @@ class QueryService:
 
         return text_formatter.format_to_html(full_response)
 
-    def process_enquiry(self, query: str) -> str:
-        """Process a general enquiry."""
+    def _is_complete_visitor_answer(self, html: str) -> bool:
+        """Answers with a missing evidence summary are not worth caching."""
+        return self.EVIDENCE_SUMMARY_UNAVAILABLE not in html
+
+    def process_visitor_query(self, query: str, use_cache: bool = True) -> str:
+        """Process a visitor-focused query."""
+        embeddings = EmbeddingContext()
+        messages, context, documents = self._visitor_messages(query, embeddings)
+
+        def produce() -> str:
+            # The analysis and the evidence summary only depend on the context, so run them together
+            timeout = bound_timeout(config.llm_call_timeout, "visitor analysis")
+            started = time.monotonic()
+            # Completions use their routed timeouts, which openai_service shortens to fit the deadline;
+            # the local timeout only bounds how long the request waits for them
+            analysis_future = self._submit(openai_service.generate_completion, messages, task="analysis")
+            summary_future = None
+            if self._time_for_evidence_summary():
+                summary_future = self._submit(self.get_evidence_summary, context)
+
+            text = analysis_future.result(timeout=timeout)
+            evidence_summary = self.EVIDENCE_SUMMARY_UNAVAILABLE
+            if summary_future is not None:
+                evidence_summary = self._await_evidence_summary(summary_future, timeout - (time.monotonic() - started))
+
+            return self._visitor_response(text, evidence_summary, context)
+
+        return self._cached_answer(
+            "visitorevidence", query, embeddings, documents, produce, use_cache, self._is_complete_visitor_answer
+        )
+
+    def stream_visitor_query(self, query: str, use_cache: bool = True):
+        """Stream a visitor-focused query as server-sent events."""
+        embeddings = EmbeddingContext()
+        messages, context, documents = self._visitor_messages(query, embeddings)
+
+        timeout = bound_timeout(config.llm_call_timeout, "visitor analysis")
+        started = time.monotonic()
+        summary_futures = []
+
+        def start_summary() -> None:
+            if self._time_for_evidence_summary():
+                summary_futures.append(self._submit(self.get_evidence_summary, context))
+
+        def finish(text: str) -> str:
+            evidence_summary = self.EVIDENCE_SUMMARY_UNAVAILABLE
+            if summary_futures:
+                left = timeout - (time.monotonic() - started)
+                evidence_summary = self._await_evidence_summary(summary_futures[0], left)
+            return self._visitor_response(text, evidence_summary, context)
+
+        return self._stream(
+            "visitorevidence",
+            query,
+            embeddings,
+            documents,
+            messages,
+            use_cache,
+            render=lambda text: self._visitor_response(text, "Summarising evidence…", context),
+            finish=finish,
+            cacheable=self._is_complete_visitor_answer,
+            on_miss=start_summary,
+            task="analysis",
+        )
+
+    def _enquiry_messages(self, query: str) -> tuple:
+        """Build the general enquiry prompt, returning the messages and the retrieved documents."""
         question = (
             "Your role is to answer the query by providing a clear and concise response "
             "in less than 200 words and drawing exclusively from the Context, and explain "
@@ -97,12 +311,26 @@ class QueryService:
         )
 
         blog_assertions = database_service.get_blog_assertions(query)
-        prompt = f"{question}\n\nContext: {blog_assertions}"
+        context, _ = context_packer.pack(blog_assertions, config.context_budget("enquiry"), name="enquiry")
+        prompt = f"{question}\n\nContext:\n{context}"
 
-        messages = [{"role": "user", "content": prompt}]
-        text = openai_service.generate_completion(messages)
+        return [{"role": "user", "content": prompt}], blog_assertions
 
-        return text_formatter.format_to_html(text)
+    def process_enquiry(self, query: str, use_cache: bool = True) -> str:
+        """Process a general enquiry."""
+        embeddings = EmbeddingContext()
+        messages, documents = self._enquiry_messages(query)
+
+        def produce() -> str:
+            return text_formatter.format_to_html(openai_service.generate_completion(messages, task="enquiry"))
+
+        return self._cached_answer("enquiries", query, embeddings, documents, produce, use_cache)
+
+    def stream_enquiry(self, query: str, use_cache: bool = True):
+        """Stream a general enquiry as server-sent events."""
+        embeddings = EmbeddingContext()
+        messages, documents = self._enquiry_messages(query)
+        return self._stream("enquiries", query, embeddings, documents, messages, use_cache, task="enquiry")
 
     def break_down_query(self, query: str) -> List[Dict[str, str]]:
         """Break down a query into constituent components."""
@@ -114,26 +342,75 @@ class QueryService:
         )
 
         messages = [{"role": "user", "content": question}]
-        text = openai_service.generate_completion(messages)
+        text = openai_service.generate_completion(messages, task="break_down_query")
 
         return ast.literal_eval(text)
 
     def process_advanced_query(self, query: str) -> str:
         """Process an advanced query using component breakdown."""
         components = self.break_down_query(query)
-        full_context = []
 
-        for component in components:
-            context = database_service.get_policy_assertions(component["component"], limit=15)
-            full_context.extend(context)
+        # Embed every component in one call; repeated components share a vector
+        embeddings = EmbeddingContext()
+        texts = list(dict.fromkeys(component["component"] for component in components))
+        try:
+            vectors = embeddings.get_many(texts)
+        except Exception as e:
+            # Answer from the model alone rather than failing the request
+            logger.error(f"Error embedding advanced query components: {e}")
+            texts, vectors = [], []
+
+        # Components are independent, so look them up side by side
+        results = retrieval_executor.run(
+            {
+                text: (
+                    lambda text=text, vector=vector: database_service.get_policy_assertions(
+                        text, limit=config.advanced_query_component_limit, vector=vector
+                    )
+                )
+                for text, vector in zip(texts, vectors)
+            }
+        )
+        documents = self._merge_component_results(results.values(), config.advanced_query_max_documents)
+        full_context, report = context_packer.pack(
+            documents, config.context_budget("advanced"), POLICY_FIELDS, name="advanced"
+        )
+        logger.info(f"Advanced query: {len(texts)} components, {report['items']} documents in context")
 
-        question = f"Please answer the query using the context. en-gb:\n\nQuery: {query}\n\nContext: {full_context}"
+        question = f"Please answer the query using the context. en-gb:\n\nQuery: {query}\n\nContext:\n{full_context}"
 
         messages = [{"role": "user", "content": question}]
-        return openai_service.generate_completion(messages)
-
-    def process_policy_query(self, query: str) -> str:
-        """Process a policy-focused query."""
+        return openai_service.generate_completion(messages, task="advanced")
+
+    @staticmethod
+    def _merge_component_results(result_lists, max_documents: int) -> List[Dict[str, Any]]:
+        """
+        Merge per-component retrieval results into a single ranked context.
+
+        Args:
+            result_lists: Document lists, one per component.
+            max_documents: Maximum number of documents kept.
+
+        Returns:
+            Documents deduplicated by id, keeping each one's best similarity, most similar first.
+        """
+        best = {}
+        for documents in result_lists:
+            for document in documents:
+                key = document.get("_id") or (document.get("Name"), document.get("PolicyAssertion"))
+                current = best.get(key)
+                if current is None or document.get("$similarity", 0) > current.get("$similarity", 0):
+                    best[key] = document
+
+        ranked = sorted(best.values(), key=lambda document: document.get("$similarity", 0), reverse=True)
+
+        return [
+            {key: value for key, value in document.items() if key not in VOLATILE_FIELDS}
+            for document in ranked[:max_documents]
+        ]
+
+    def _policy_messages(self, query: str, embeddings: EmbeddingContext) -> tuple:
+        """Build the policy query prompt, returning the messages and the retrieved documents."""
         question = (
             "You are a policy assistant responding to requests by highlighting the "
             "Scottish Wildlife Trust's policy assertions. You responses always use UK "
@@ -145,24 +422,48 @@ class QueryService:
             f"\n\n{query}"
         )
 
-        vector_context = database_service.get_policy_assertions(query)
-        formatted_context = text_formatter.format_context_items(vector_context, "policy_assertions")
+        vector_context = database_service.get_policy_assertions(query, vector=self._query_vector(query, embeddings))
+        formatted_context = self._pack_formatted(vector_context, "policy_assertions", "policy")
 
         prompt = f"{question}\n\nPolicy assertions:{formatted_context}"
 
-        messages = [{"role": "user", "content": prompt}]
-        text = openai_service.generate_completion(messages)
+        return [{"role": "user", "content": prompt}], vector_context
 
-        return text_formatter.format_to_html(text)
-
-    def write_blog(self, query: str) -> str:
-        """Write a blog post based on the query."""
-        assertions_cursor = database_service.get_blog_assertions(query)
-        policies_cursor = database_service.get_policy_assertions(query)
-
-        # Convert cursors to lists
-        assertions = list(assertions_cursor)
-        policies = list(policies_cursor)
+    def process_policy_query(self, query: str, use_cache: bool = True) -> str:
+        """Process a policy-focused query."""
+        embeddings = EmbeddingContext()
+        messages, documents = self._policy_messages(query, embeddings)
+
+        def produce() -> str:
+            return text_formatter.format_to_html(openai_service.generate_completion(messages, task="policy"))
+
+        return self._cached_answer("policyquery", query, embeddings, documents, produce, use_cache)
+
+    def stream_policy_query(self, query: str, use_cache: bool = True):
+        """Stream a policy-focused query as server-sent events."""
+        embeddings = EmbeddingContext()
+        messages, documents = self._policy_messages(query, embeddings)
+        return self._stream("policyquery", query, embeddings, documents, messages, use_cache, task="policy")
+
+    def _blog_messages(self, query: str, embeddings: EmbeddingContext) -> tuple:
+        """Build the blog post prompt, returning the messages and the retrieved documents."""
+        # The two collections are independent, so look them up side by side
+        results = retrieval_executor.run(
+            {
+                "assertions": lambda: list(database_service.get_blog_assertions(query)),
+                "policies": lambda: list(
+                    database_service.get_policy_assertions(query, vector=self._query_vector(query, embeddings))
+                ),
+            }
+        )
+        assertions = results["assertions"]
+        policies = results["policies"]
+        assertions_context, _ = context_packer.pack(
+            assertions, config.context_budget("blog_assertions"), name="blog_assertions"
+        )
+        policies_context, _ = context_packer.pack(
+            policies, config.context_budget("blog_policies"), POLICY_FIELDS, name="blog_policies"
+        )
 
         content = (
             "Please write a 400-word blog post with an engaging title in response to "
@@ -171,14 +472,27 @@ class QueryService:
             "the year and source with a URL. The blog should be clear, informative, "
             "and suitable for a general audience. Use straightforward language and "
             "avoid overly formal or dramatic terms. Make sure the arguments are "
-            f"balanced and include references. \n\nQuery: {query}\n\nAssertions: {assertions}"
-            f"\n\nPolicy Assertions: {policies}"
+            f"balanced and include references. \n\nQuery: {query}\n\nAssertions:\n{assertions_context}"
+            f"\n\nPolicy Assertions:\n{policies_context}"
         )
 
-        messages = [{"role": "user", "content": content}]
-        text = openai_service.generate_completion(messages)
+        return [{"role": "user", "content": content}], assertions + policies
+
+    def write_blog(self, query: str, use_cache: bool = True) -> str:
+        """Write a blog post based on the query."""
+        embeddings = EmbeddingContext()
+        messages, documents = self._blog_messages(query, embeddings)
+
+        def produce() -> str:
+            return text_formatter.format_to_html(openai_service.generate_completion(messages, task="blog"))
+
+        return self._cached_answer("blog", query, embeddings, documents, produce, use_cache)
 
-        return text_formatter.format_to_html(text)
+    def stream_blog(self, query: str, use_cache: bool = True):
+        """Stream a blog post as server-sent events."""
+        embeddings = EmbeddingContext()
+        messages, documents = self._blog_messages(query, embeddings)
+        return self._stream("blog", query, embeddings, documents, messages, use_cache, task="blog")
 
     def tag_summary(self, summary: str) -> str:
         """Generate a tag for a given summary."""
@@ -190,7 +504,7 @@ class QueryService:
         ).format(summary=summary)
 
         messages = [{"role": "user", "content": question}]
-        return openai_service.generate_completion(messages)
+        return openai_service.generate_completion(messages, cache=True, task="tag_summary")
 
 
 # Global service instance
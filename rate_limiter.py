@@ -0,0 +1,176 @@
+"""
+Client-side rate limiting with token buckets, a concurrency cap and adaptive retries.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from deadline import remaining
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute: float):
+        """
+        Args:
+            per_minute: Budget per minute. 0 or less disables the bucket.
+        """
+        self.capacity = float(per_minute)
+        self.enabled = per_minute > 0
+        self._tokens = self.capacity
+        self._rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """Block until amount is available, returning the seconds spent waiting."""
+        if not self.enabled:
+            return 0.0
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self._rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the provider reports the limit has been hit."""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Shares request and token budgets and an in-flight cap across threads, and retries
+    retryable failures with jittered exponential backoff, honouring server retry hints.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 0,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        is_retryable: Callable[[Exception], bool] = None,
+        retry_after: Callable[[Exception], Optional[float]] = None,
+        is_throttled: Callable[[Exception], bool] = None,
+    ):
+        """
+        Args:
+            requests_per_minute: Request budget. 0 disables it.
+            tokens_per_minute: Token budget. 0 disables it.
+            max_concurrency: Maximum calls in flight. 0 disables the cap.
+            max_retries: Retries after the first attempt for retryable errors.
+            base_delay: First backoff delay in seconds, doubled on each retry.
+            max_delay: Upper bound on a single backoff delay.
+            is_retryable: Returns True if an exception should be retried.
+            retry_after: Returns the server-requested delay for an exception, if any.
+            is_throttled: Returns True if an exception means the provider limit was hit.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._is_retryable = is_retryable or (lambda e: False)
+        self._retry_after = retry_after or (lambda e: None)
+        self._is_throttled = is_throttled or (lambda e: False)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "throttled": 0,
+            "failures": 0,
+            "in_flight": 0,
+            "queue_seconds_total": 0.0,
+            "queue_seconds_max": 0.0,
+        }
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the in-flight slots, yielding the seconds spent waiting for it."""
+        started = time.monotonic()
+        if self._semaphore is not None:
+            self._semaphore.acquire()
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self._stats["in_flight"] += 1
+        try:
+            yield waited
+        finally:
+            with self._stats_lock:
+                self._stats["in_flight"] -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Return the delay before the given retry attempt, preferring the server's hint."""
+        hinted = self._retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        """Run fn within the budgets and in-flight cap, retrying retryable errors."""
+        attempt = 0
+        while True:
+            queued = self.requests.acquire(1) + self.tokens.acquire(estimated_tokens)
+            with self.slot() as slot_wait:
+                self._record_queue(queued + slot_wait)
+                try:
+                    return fn()
+                except Exception as e:
+                    throttled = self._is_throttled(e)
+                    if throttled:
+                        # The provider is out of budget, so stop other threads spending ours
+                        self.requests.drain()
+                    delay = self.backoff(attempt, e)
+                    # Give up early rather than sleep past the request deadline
+                    left = remaining()
+                    out_of_time = left is not None and left <= delay
+                    if attempt >= self.max_retries or not self._is_retryable(e) or out_of_time:
+                        with self._stats_lock:
+                            self._stats["failures"] += 1
+                            self._stats["throttled"] += int(throttled)
+                        raise
+                    with self._stats_lock:
+                        self._stats["retries"] += 1
+                        self._stats["throttled"] += int(throttled)
+                    error_name = type(e).__name__
+            logger.warning(f"Retrying after {error_name} in {delay:.2f}s (attempt {attempt + 1})")
+            time.sleep(delay)
+            attempt += 1
+
+    def _record_queue(self, seconds: float) -> None:
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            self._stats["queue_seconds_total"] += seconds
+            self._stats["queue_seconds_max"] = max(self._stats["queue_seconds_max"], seconds)
+
+    def stats(self) -> dict:
+        """Return call, retry and queueing-time counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_seconds_avg"] = round(stats["queue_seconds_total"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["queue_seconds_total"] = round(stats["queue_seconds_total"], 4)
+        stats["queue_seconds_max"] = round(stats["queue_seconds_max"], 4)
+        return stats
@@ -0,0 +1,99 @@
+"""
+Similarity cutoff and maximal-marginal-relevance reranking of vector search results.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import config
+
+# Fields requested only for reranking, removed before results reach prompts
+VECTOR_FIELDS = ("$vector", "$vectorize")
+
+
+def strip_vectors(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the documents without their embedding fields."""
+    return [{key: value for key, value in document.items() if key not in VECTOR_FIELDS} for document in documents]
+
+
+def rerank(
+    documents: List[Dict[str, Any]],
+    limit: Optional[int] = None,
+    min_similarity: float = 0.0,
+    diversity: float = 0.3,
+    duplicate_threshold: float = 1.0,
+    min_results: int = 1,
+    vector_field: str = "$vector",
+    score_field: str = "$similarity",
+) -> List[Dict[str, Any]]:
+    """
+    Select relevant, mutually distinct documents from ranked vector search results.
+
+    Args:
+        documents: Search results, most similar first, with a similarity score and optionally an embedding.
+        limit: Maximum documents returned. Defaults to all that pass the filters.
+        min_similarity: Documents scoring below this are dropped.
+        diversity: MMR trade-off between relevance (0) and distinctness from documents already chosen (1).
+        duplicate_threshold: Documents whose embedding has at least this cosine similarity to a chosen
+            one are dropped as near-duplicates. 1.0 keeps them.
+        min_results: Documents kept even if they fall below min_similarity, so prompts are never empty.
+        vector_field: Field holding each document's embedding.
+        score_field: Field holding each document's similarity to the query.
+
+    Returns:
+        The selected documents in MMR order, still carrying their embeddings.
+    """
+    limit = len(documents) if limit is None else limit
+    candidates = [document for document in documents if document.get(score_field, 1.0) >= min_similarity]
+    if len(candidates) < min_results:
+        candidates = documents[:min_results]
+
+    # Without embeddings only the cutoff can be applied
+    if not candidates or any(document.get(vector_field) is None for document in candidates):
+        return candidates[:limit]
+
+    vectors = np.asarray([document[vector_field] for document in candidates], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    cosine = vectors @ vectors.T
+    relevance = np.asarray([document.get(score_field, 1.0) for document in candidates], dtype=np.float32)
+    # Vector stores report similarity on a 0-1 scale, so compare redundancy on the same scale
+    redundancy = (1 + cosine) / 2
+
+    available = np.ones(len(candidates), dtype=bool)
+    closest = np.full(len(candidates), -np.inf, dtype=np.float32)
+    selected = []
+    while len(selected) < limit and available.any():
+        penalty = np.where(np.isfinite(closest), closest, 0)
+        scores = np.where(available, (1 - diversity) * relevance - diversity * penalty, -np.inf)
+        index = int(np.argmax(scores))
+        available[index] = False
+        if selected and cosine[index, selected].max() >= duplicate_threshold:
+            continue
+        selected.append(index)
+        closest = np.maximum(closest, redundancy[index])
+
+    return [candidates[index] for index in selected]
+
+
+def rerank_results(documents: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Rerank search results with the configured settings and drop their embeddings."""
+    if not config.rerank_enabled:
+        return strip_vectors(documents[:limit])
+    return strip_vectors(
+        rerank(
+            documents,
+            limit=limit,
+            min_similarity=config.rerank_min_similarity,
+            diversity=config.rerank_diversity,
+            duplicate_threshold=config.rerank_duplicate_threshold,
+        )
+    )
+
+
+def candidate_count(limit: int) -> int:
+    """Number of results to fetch so reranking has room to replace dropped ones."""
+    if not config.rerank_enabled:
+        return limit
+    return max(limit, int(round(limit * config.rerank_overfetch)))
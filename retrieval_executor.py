@@ -0,0 +1,71 @@
+"""
+Parallel execution of independent retrieval lookups.
+"""
+
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict
+
+from config import config
+from deadline import remaining
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalExecutor:
+    """Runs independent collection lookups in parallel and joins them under a deadline."""
+
+    def __init__(self, max_workers: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """Submit a single call, carrying the caller's context variables into the worker thread."""
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, fn, *args, **kwargs)
+
+    def run(
+        self, lookups: Dict[str, Callable[[], Any]], timeout: float = None, fallback: Callable[[], Any] = list
+    ) -> Dict[str, Any]:
+        """
+        Run named lookups concurrently and collect their results.
+
+        Args:
+            lookups: Mapping of name to a zero-argument callable performing the lookup.
+            timeout: Seconds to wait for all lookups. Defaults to RETRIEVAL_TIMEOUT, and never
+                extends past the request deadline.
+            fallback: Factory for the value used when a lookup fails or misses the deadline.
+
+        Returns:
+            A mapping of name to result, with fallback values for failed or late lookups.
+        """
+        if timeout is None:
+            timeout = config.retrieval_timeout
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, left)
+
+        started = time.monotonic()
+        futures = {name: self.submit(lookup) for name, lookup in lookups.items()}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                logger.warning(f"Retrieval '{name}' missed the {timeout:.1f}s deadline, continuing without it")
+                results[name] = fallback()
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Retrieval '{name}' failed: {e}")
+                results[name] = fallback()
+
+        logger.debug(f"Retrieved {list(lookups)} in {time.monotonic() - started:.3f}s")
+        return results
+
+
+# Global executor instance
+retrieval_executor = RetrievalExecutor(max_workers=config.retrieval_max_workers)
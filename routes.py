@@ -1,11 +1,17 @@
 import re
-from flask import Blueprint, current_app, request, send_file
+from flask import Blueprint, Response, current_app, make_response, request, send_file, stream_with_context
 from word import revised_document
 import base64
-from database_factory import DatabaseServiceFactory
+from database_factory import database_pool
 from config import config
 from query_service import query_service
+from job_queue import job_queue
+from streaming import EVENT_STREAM_MIMETYPE, wants_event_stream
+from deadline import set_deadline
+from compression import conditional
 from functools import wraps
+import json
+import uuid
 
 # This is the path to the directory where you want to save the uploaded files.
 # Make sure this directory exists on your server.
@@ -14,15 +20,15 @@ app = current_app
 routes_bp = Blueprint("vectorsearch", __name__)
 
 
-# Initialize database services based on configuration
+# Database services are pooled per process so requests reuse warm connections
 def get_astra_service():
-    """Get Astra service instance."""
-    return DatabaseServiceFactory.create_service("astra")
+    """Get the pooled Astra service instance."""
+    return database_pool.get_service("astra")
 
 
 def get_azure_service():
-    """Get Azure service instance."""
-    return DatabaseServiceFactory.create_service("azure")
+    """Get the pooled Azure service instance."""
+    return database_pool.get_service("azure")
 
 
 def get_current_service():
@@ -35,15 +41,65 @@ def get_current_service():
 
 
 def set_current_service(service):
-    """Set the current service instance."""
-    if service.lower() == "azure":
-        config.database_provider = DatabaseServiceFactory.create_service("azure")
-    elif service.lower() == "astra":
-        config.database_provider = DatabaseServiceFactory.create_service("astra")
+    """Set the current service provider, warming its pooled instance."""
+    if service.lower() in ("azure", "astra"):
+        database_pool.get_service(service.lower())
+        config.database_provider = service.lower()
     else:
         raise ValueError(f"Unsupported service: {service}. Supported services are 'azure' and 'astra'.")
 
 
+def cache_bypassed():
+    """
+    Return True if the client explicitly asked to skip the semantic response cache.
+
+    Cache-Control is deliberately ignored: browsers send no-cache on every hard reload,
+    which would turn each reload into a full completion.
+    """
+    opt_out = request.headers.get("X-Cache-Bypass") or request.args.get("nocache", "")
+    return opt_out.lower() in ("1", "true", "yes")
+
+
+def query_response(process, stream, query):
+    """Return the processed answer, or a server-sent event stream if the client asked for one."""
+    use_cache = not cache_bypassed()
+    try:
+        if wants_event_stream(request):
+            # Retrieval runs before the first event, so a deadline hit there still gets a 504;
+            # once streaming has started, failures are sent as an error event instead
+            events = stream(query, use_cache=use_cache)
+            return Response(
+                stream_with_context(events),
+                mimetype=EVENT_STREAM_MIMETYPE,
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        return process(query, use_cache=use_cache)
+    except TimeoutError as e:
+        # Includes DeadlineExceeded: the request's time budget ran out before an answer was ready
+        return {"error": f"Request timed out: {str(e) or 'deadline exceeded'}"}, 504
+
+
+@routes_bp.before_request
+def start_request_deadline():
+    """Start the request's time budget from the endpoint default or the X-Request-Deadline header."""
+    rule = request.url_rule.rule if request.url_rule else request.path
+    seconds = config.request_deadlines.get(rule)
+    header = request.headers.get("X-Request-Deadline")
+    if header:
+        try:
+            requested = float(header)
+            if requested > 0:
+                seconds = min(requested, config.request_deadline_max)
+        except ValueError:
+            pass
+    set_deadline(seconds)
+
+
+@routes_bp.teardown_request
+def clear_request_deadline(exception=None):
+    set_deadline(None)
+
+
 # Middleware to check API key
 def require_api_key(f):
     @wraps(f)
@@ -73,7 +129,7 @@ def enquiries():
 
         # Set the current service to Astra
         set_current_service("astra")
-        response = query_service.process_enquiry(query)
+        response = query_response(query_service.process_enquiry, query_service.stream_enquiry, query)
         return response
     except Exception as e:
         return {"error": f"Failed to process enquiry: {str(e)}"}, 500
@@ -95,7 +151,7 @@ def policyquery():
             return {"error": "Query parameter is required"}, 400
 
         set_current_service("astra")
-        response = query_service.process_policy_query(query)
+        response = query_response(query_service.process_policy_query, query_service.stream_policy_query, query)
         return response
 
     except Exception as e:
@@ -119,7 +175,7 @@ def vcquery():
 
         # Set the current service to Astra
         set_current_service("astra")
-        response = query_service.process_visitor_query(query)
+        response = query_response(query_service.process_visitor_query, query_service.stream_visitor_query, query)
         return response
     except Exception as e:
         return {"error": f"Failed to process visitor evidence query: {str(e)}"}, 500
@@ -142,7 +198,7 @@ def blog():
 
         # Set the current service to Astra
         set_current_service("astra")
-        response = query_service.write_blog(query)
+        response = query_response(query_service.write_blog, query_service.stream_blog, query)
         return response
     except Exception as e:
         return {"error": f"Failed to generate blog: {str(e)}"}, 500
@@ -199,6 +255,28 @@ def health():
         return {"error": f"Health check failed: {str(e)}"}, 500
 
 
+@routes_bp.route("/stats", methods=["GET"])
+@require_api_key
+def stats():
+    """Report cache and client statistics for this worker process."""
+    from openai_service import openai_service
+
+    from semantic_cache import semantic_cache
+    from context_packer import context_packer
+
+    stats = {
+        "embedding_cache": openai_service.embedding_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "completion_cache": openai_service.completion_cache.stats(),
+        "openai_rate_limiter": openai_service.rate_limiter.stats(),
+        "completion_tasks": openai_service.task_stats.stats(),
+        "context_packer": context_packer.stats(),
+    }
+    if openai_service.embedding_batcher is not None:
+        stats["embedding_batcher"] = openai_service.embedding_batcher.stats()
+    return stats
+
+
 @routes_bp.route("/search", methods=["POST"])
 @require_api_key
 def search():
@@ -231,6 +309,43 @@ def search():
         return {"error": f"Failed to search: {str(e)}"}, 500
 
 
+@routes_bp.route("/hybrid", methods=["POST"])
+@require_api_key
+def hybrid():
+    """Search several backends and the knowledge graph at once, fusing the results by rank."""
+    from hybrid_retrieval import hybrid_retriever, json_safe
+
+    try:
+        data = request.get_json() if request.is_json else request.form
+        query = data.get("query")
+        sources = data.get("sources")
+        if isinstance(sources, str):
+            sources = [source.strip() for source in sources.split(",") if source.strip()]
+
+        if not query:
+            return {"error": "Query parameter is required"}, 400
+        try:
+            limit = int(data.get("limit", 10))
+            timeout = float(data["timeout"]) if data.get("timeout") else None
+        except (TypeError, ValueError):
+            return {"error": "limit must be an integer and timeout a number of seconds"}, 400
+        if limit < 1 or (timeout is not None and timeout <= 0):
+            return {"error": "limit and timeout must be positive"}, 400
+
+        try:
+            retrieved = hybrid_retriever.retrieve(query, limit=limit, sources=sources, timeout=timeout)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        results = [
+            {"document": json_safe(entry["document"]), "score": entry["score"], "sources": entry["sources"]}
+            for entry in retrieved["results"]
+        ]
+        return dict(retrieved, results=results, query=query, count=len(results))
+    except Exception as e:
+        return {"error": f"Failed to search: {str(e)}"}, 500
+
+
 @routes_bp.route("/wordify", methods=["POST"])
 @require_api_key
 def wordify():
@@ -258,12 +373,22 @@ def wordify():
     )
 
 
+def message_document(data):
+    """Build a message document from request data, generating an id if none is provided."""
+    return {
+        "id": data.get("id") or str(uuid.uuid4()),
+        "message": data.get("message"),
+        "summary": data.get("summary", ""),
+        "uploadDate": data.get("uploadDate", ""),
+        "url": data.get("url", ""),
+        "tag": data.get("tag", ""),
+    }
+
+
 @routes_bp.route("/add_message", methods=["POST"])
 @require_api_key
 def add_message():
     """Add a message document to Azure Cognitive Search."""
-    import uuid
-
     try:
         if request.is_json:
             data = request.get_json()
@@ -275,30 +400,17 @@ def add_message():
         if not message:
             return {"error": "'message' field is required"}, 400
 
-        doc_id = data.get("id") or str(uuid.uuid4())
-        summary = data.get("summary", "")
-        upload_date = data.get("uploadDate", "")
-        url = data.get("url", "")
-        tag = data.get("tag", "")
+        doc = message_document(data)
+        doc_id = doc["id"]
 
         # Generate content_vector from message
         from openai_service import openai_service
 
         try:
-            content_vector = openai_service.get_embeddings(message)
+            doc["content_vector"] = openai_service.get_embeddings(message)
         except Exception as e:
             return {"error": f"Failed to generate content_vector: {str(e)}"}, 500
 
-        doc = {
-            "id": doc_id,
-            "message": message,
-            "summary": summary,
-            "uploadDate": upload_date,
-            "url": url,
-            "content_vector": content_vector,
-            "tag": tag,
-        }
-
         azure_service = get_azure_service()
         success = azure_service.upload_documents("messages", [doc])
         if success:
@@ -309,17 +421,76 @@ def add_message():
         return {"error": f"Failed to add message: {str(e)}"}, 500
 
 
+@routes_bp.route("/add_messages", methods=["POST"])
+@require_api_key
+def add_messages():
+    """
+    Bulk-add message documents to Azure Cognitive Search.
+
+    Accepts a JSON array (or an object with a 'messages' array) or NDJSON, one message per
+    line. Add ?async=1 to run the import as a background job.
+    """
+    try:
+        if request.is_json:
+            data = request.get_json()
+            items = data.get("messages", []) if isinstance(data, dict) else data
+        else:
+            lines = request.get_data(as_text=True).splitlines()
+            items = [json.loads(line) for line in lines if line.strip()]
+    except ValueError as e:
+        return {"error": f"Invalid JSON or NDJSON body: {str(e)}"}, 400
+
+    if not isinstance(items, list) or not items:
+        return {"error": "A non-empty list of messages is required"}, 400
+
+    documents = []
+    rejected = []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("message"):
+            rejected.append({"index": index, "status": "failed", "error": "'message' field is required"})
+            continue
+        document = message_document(item)
+        if document["id"] in seen:
+            # Only the first message with an id is imported; outcomes are reported per id
+            rejected.append({"index": index, "id": document["id"], "status": "failed", "error": "Duplicate id"})
+            continue
+        seen.add(document["id"])
+        documents.append(document)
+
+    try:
+        azure_service = get_azure_service()
+        if request.args.get("async", "").lower() in ("1", "true", "yes"):
+            job = job_queue.submit("add_messages", azure_service.upload_documents_bulk, "messages", documents)
+            response, status = job_accepted(job, f"Import of {len(documents)} messages has been queued.")
+            response["rejected"] = rejected
+            return response, status
+
+        report = azure_service.upload_documents_bulk("messages", documents)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": f"Failed to add messages: {str(e)}"}, 500
+
+    report["failed"] += len(rejected)
+    report["total"] += len(rejected)
+    report["rejected"] = rejected
+    return report, 200 if report["failed"] == 0 else 207
+
+
+def job_accepted(job, message):
+    """Build the 202 response for a queued background job."""
+    return {"status": "accepted", "message": message, "job_id": job.id, "status_url": f"/jobs/{job.id}"}, 202
+
+
 @routes_bp.route("/delete_messages", methods=["DELETE"])
 @require_api_key
 def delete_messages():
-    """Delete all messages from Azure Cognitive Search."""
+    """Queue deletion of all messages from Azure Cognitive Search."""
     try:
         azure_service = get_azure_service()
-        success = azure_service.delete_all_documents("messages")
-        if success:
-            return {"status": "success", "message": "All messages deleted from Azure Search."}
-        else:
-            return {"error": "Failed to delete messages from Azure Search."}, 500
+        job = job_queue.submit("delete_messages", azure_service.delete_all_documents, "messages")
+        return job_accepted(job, "Deletion of all messages has been queued.")
     except Exception as e:
         return {"error": f"Failed to delete messages: {str(e)}"}, 500
 
@@ -342,13 +513,17 @@ def get_recent_messages():
 
     try:
         azure_service = get_azure_service()
-        startdate = datetime.now() - timedelta(days=3)
-        recent_messages = azure_service.get_messages_since(startdate, return_format=return_format)
+        startdate = datetime.now() - timedelta(days=days)
 
-        if recent_messages:
-            return recent_messages
-        else:
-            return []
+        # Stream the HTML table as rows arrive when asked, so large pages start rendering at once
+        if return_format == "html" and request.args.get("stream", "").lower() in ("1", "true", "yes"):
+            return Response(stream_with_context(azure_service.stream_messages_since(startdate)), mimetype="text/html")
+
+        # Failures raise into the error response below rather than being served as a cacheable page
+        recent_messages = azure_service.find_messages_since(startdate, return_format=return_format)
+
+        # Unchanged messages answer 304 to clients that send the previous ETag
+        return conditional(make_response(recent_messages or []))
     except Exception as e:
         return {"error": f"Failed to fetch recent messages: {str(e)}"}, 500
 
@@ -379,14 +554,20 @@ def delete_message():
 @routes_bp.route("/retag", methods=["GET"])
 @require_api_key
 def retag():
-    """Handle retagging of all messages in Azure Cognitive Search."""
+    """Queue retagging of all messages in Azure Cognitive Search."""
     try:
         azure_service = get_azure_service()
-        success = azure_service.retag_all_messages()
-
-        if success:
-            return {"status": "success", "message": "All messages retagged successfully."}
-        else:
-            return {"error": "Failed to retag all messages."}, 500
+        job = job_queue.submit("retag", azure_service.retag_all_messages)
+        return job_accepted(job, "Retagging of all messages has been queued.")
     except Exception as e:
         return {"error": f"Failed to retag messages: {str(e)}"}, 500
+
+
+@routes_bp.route("/jobs/<job_id>", methods=["GET"])
+@require_api_key
+def job_status(job_id):
+    """Report the status and progress of a background job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"error": f"Job {job_id} not found."}, 404
+    return conditional(make_response(job))
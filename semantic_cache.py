@@ -0,0 +1,117 @@
+"""
+Semantic response cache for query endpoints.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import config
+
+# Scores and vectors the stores attach to results; they vary between searches for the same document
+VOLATILE_FIELDS = ("$similarity", "$vector", "@search.score")
+
+
+class SemanticCache:
+    """
+    Caches rendered answers by query meaning rather than exact text.
+
+    An answer is reused when a new query for the same endpoint has a query embedding whose
+    cosine similarity to a cached one meets the threshold, and the documents retrieved for
+    it are identical to those the cached answer was generated from. Retrieval therefore
+    still runs on every request; only the completion is skipped.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl: Optional[float] = None):
+        """
+        Args:
+            threshold: Minimum cosine similarity between query embeddings for a hit.
+            max_entries: Entries kept before the least recently used is evicted.
+            ttl: Seconds an entry stays valid. None or 0 disables expiry.
+        """
+        self.threshold = threshold
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl or None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    @classmethod
+    def fingerprint(cls, documents: List[Dict[str, Any]]) -> str:
+        """Hash the content of the retrieved documents, ignoring scores and vectors."""
+        content = [
+            {key: value for key, value in document.items() if key not in VOLATILE_FIELDS}
+            for document in documents
+        ]
+        payload = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def lookup(self, endpoint: str, vector: List[float], fingerprint: str) -> Optional[str]:
+        """Return a cached answer for a semantically equivalent query over the same documents."""
+        query = self._unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                (entry_id, entry)
+                for entry_id, entry in self._entries.items()
+                if entry["endpoint"] == endpoint and (self.ttl is None or now - entry["stored_at"] <= self.ttl)
+            ]
+            if candidates:
+                similarities = np.stack([entry["vector"] for _, entry in candidates]) @ query
+                for index in np.argsort(similarities)[::-1]:
+                    if similarities[index] < self.threshold:
+                        break
+                    entry_id, entry = candidates[index]
+                    if entry["fingerprint"] == fingerprint:
+                        self._entries.move_to_end(entry_id)
+                        self._stats["hits"] += 1
+                        return entry["html"]
+                    self._stats["stale"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, endpoint: str, vector: List[float], fingerprint: str, html: str) -> None:
+        """Cache a rendered answer for the query embedding and document fingerprint."""
+        with self._lock:
+            self._entries[self._next_id] = {
+                "endpoint": endpoint,
+                "vector": self._unit(vector),
+                "fingerprint": fingerprint,
+                "html": html,
+                "stored_at": time.monotonic(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit, miss and stale-document counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+# Global cache instance
+semantic_cache = SemanticCache(
+    threshold=config.semantic_cache_threshold,
+    max_entries=config.semantic_cache_size,
+    ttl=config.semantic_cache_ttl,
+)
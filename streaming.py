@@ -0,0 +1,66 @@
+"""
+Server-sent event helpers for streaming generated answers to the client.
+"""
+
+import json
+import logging
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_MIMETYPE = "text/event-stream"
+
+
+def wants_event_stream(request) -> bool:
+    """Return True if the client opted into streaming via its Accept header or a stream parameter."""
+    if request.accept_mimetypes.best_match(["application/json", "text/html", EVENT_STREAM_MIMETYPE]) == (
+        EVENT_STREAM_MIMETYPE
+    ):
+        return True
+    return request.args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Encode one server-sent event. Data is JSON so it never contains raw newlines."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_markdown(
+    deltas: Iterable[str],
+    render: Callable[[str], str],
+    finish: Optional[Callable[[str], str]] = None,
+    interval: float = 0.25,
+) -> Iterator[str]:
+    """
+    Relay completion tokens as server-sent events with incremental HTML rendering.
+
+    Every token is sent as a ``delta`` event. The accumulated markdown is re-rendered
+    into an ``html`` event at line breaks, at most once per interval, so the client can
+    show formatted output while the answer is still being written. A final ``done``
+    event carries the complete HTML, or an ``error`` event if generation fails.
+
+    Args:
+        deltas: Iterable of text fragments from the completion stream.
+        render: Converts the markdown received so far into HTML.
+        finish: Converts the complete markdown into the final HTML. Defaults to render.
+        interval: Minimum seconds between intermediate renders.
+    """
+    parts = []
+    last_render = time.monotonic()
+    try:
+        for delta in deltas:
+            parts.append(delta)
+            yield sse_event("delta", {"text": delta})
+            if "\n" in delta and time.monotonic() - last_render >= interval:
+                last_render = time.monotonic()
+                yield sse_event("html", {"html": render("".join(parts))})
+
+        yield sse_event("done", {"html": (finish or render)("".join(parts))})
+    except TimeoutError as e:
+        # Includes DeadlineExceeded; the status line has already been sent, so report it in-band
+        logger.error(f"Streaming response timed out: {e}")
+        yield sse_event("error", {"error": f"Request timed out: {str(e) or 'deadline exceeded'}", "timeout": True})
+    except Exception as e:
+        logger.error(f"Streaming response failed: {e}")
+        yield sse_event("error", {"error": str(e)})
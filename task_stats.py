@@ -0,0 +1,68 @@
+"""
+Per-task latency, token and cost statistics for completion calls.
+"""
+
+import threading
+from typing import Optional
+
+
+class TaskStats:
+    """Thread-safe accumulator of completion statistics keyed by task name."""
+
+    def __init__(self, prices: dict = None):
+        """
+        Args:
+            prices: USD per million tokens by model, as {"model": {"input": x, "output": y}}.
+        """
+        self.prices = prices or {}
+        self._lock = threading.Lock()
+        self._tasks = {}
+
+    def record(
+        self,
+        task: str,
+        model: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: Optional[Exception] = None,
+        cancelled: bool = False,
+    ) -> None:
+        """Record one completion call. A cancelled call was abandoned by its consumer before it finished."""
+        price = self.prices.get(model, {})
+        cost = (prompt_tokens * price.get("input", 0) + completion_tokens * price.get("output", 0)) / 1_000_000
+        with self._lock:
+            stats = self._tasks.setdefault(
+                task,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "cancelled": 0,
+                    "latency_total": 0.0,
+                    "latency_max": 0.0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cost_usd": 0.0,
+                    "models": {},
+                },
+            )
+            stats["calls"] += 1
+            stats["errors"] += int(error is not None)
+            stats["cancelled"] += int(cancelled)
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cost_usd"] += cost
+            stats["models"][model] = stats["models"].get(model, 0) + 1
+
+    def stats(self) -> dict:
+        """Return per-task call counts, average and maximum latency, tokens and cost."""
+        with self._lock:
+            tasks = {task: dict(stats, models=dict(stats["models"])) for task, stats in self._tasks.items()}
+        for stats in tasks.values():
+            stats["latency_avg"] = round(stats["latency_total"] / stats["calls"], 4) if stats["calls"] else 0.0
+            stats["latency_total"] = round(stats["latency_total"], 4)
+            stats["latency_max"] = round(stats["latency_max"], 4)
+            stats["cost_usd"] = round(stats["cost_usd"], 6)
+        return tasks
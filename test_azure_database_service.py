@@ -0,0 +1,225 @@
+import pytest
+
+from azure_database_service import RESULTS_TABLE_FOOTER, RESULTS_TABLE_HEADER, format_upload_date, iter_results_table
+
+
+def test_table_rows_are_escaped_and_dates_formatted():
+    rows = "".join(
+        iter_results_table(
+            [
+                {
+                    "id": "m1",
+                    "summary": "<script>alert(1)</script>",
+                    "uploadDate": "2024-05-01T09:30:00",
+                    "tag": "conservation",
+                    "url": "https://example.org/?a=1&b='2'",
+                }
+            ]
+        )
+    )
+
+    assert rows.startswith(RESULTS_TABLE_HEADER) and rows.endswith(RESULTS_TABLE_FOOTER)
+    assert "<script>" not in rows and "&lt;script&gt;" in rows
+    assert "href='https://example.org/?a=1&amp;b=&#x27;2&#x27;'" in rows
+    assert "Wednesday, 01 May 2024, 09:30 AM" in rows
+    assert format_upload_date("not a date") == "not a date"
+
+
+def test_results_are_consumed_lazily_in_chunks():
+    consumed = []
+
+    def results():
+        for index in range(5):
+            consumed.append(index)
+            yield {"id": str(index), "uploadDate": "2024-05-01T09:30:00"}
+
+    chunks = iter_results_table(results(), chunk_rows=2)
+
+    assert next(chunks) == RESULTS_TABLE_HEADER
+    assert consumed == []
+    assert next(chunks).count("<tr") == 2
+    assert consumed == [0, 1]
+    assert [chunk.count("<tr") for chunk in chunks] == [2, 1, 0]
+
+
+def test_search_clients_are_cached_per_index_and_share_one_transport():
+    from azure_database_service import AzureSearchService
+
+    service = AzureSearchService(search_endpoint="https://example.search.windows.net", search_key="key")
+
+    messages = service._get_search_client("messages")
+    assert service._get_search_client("messages") is messages
+    other = service._get_search_client("archive")
+    assert other is not messages
+    assert service._get_index_client() is service._get_index_client()
+    assert service._transport is not None and service._session is not None
+
+    service.close_connection()
+    assert service._get_search_client("messages") is not messages
+
+
+def test_delete_all_documents_pages_keys_in_bounded_batches():
+    from types import SimpleNamespace
+
+    from azure_database_service import AzureSearchService
+
+    class FakeClient:
+        def __init__(self, count):
+            self.documents = {str(index) for index in range(count)}
+            self.batches = []
+            self.selects = []
+
+        def get_document_count(self):
+            return len(self.documents)
+
+        def search(self, search_text=None, select=None):
+            self.selects.append(select)
+            # Like skip-based paging, deletes made while iterating hide documents from this pass
+            for key in sorted(self.documents)[::2]:
+                yield {"id": key}
+
+        def delete_documents(self, documents):
+            keys = [document["id"] for document in documents]
+            self.batches.append(keys)
+            results = []
+            for key in keys:
+                failed = key == "7" and len(self.selects) == 1
+                if not failed:
+                    self.documents.discard(key)
+                results.append(SimpleNamespace(key=key, succeeded=not failed, error_message="busy"))
+            return results
+
+    client = FakeClient(2500)
+    service = AzureSearchService(search_endpoint="https://example.search.windows.net", search_key="key")
+    service._get_search_client = lambda index_name: client
+    updates = []
+
+    report = service.delete_all_documents(
+        "messages", progress=lambda *args: updates.append(args), batch_size=5000, concurrency=2, max_passes=20
+    )
+
+    assert client.documents == set()
+    assert report["deleted"] == 2500 and report["failed"] == 0 and report["failures"] == []
+    assert report["passes"] > 1
+    assert max(len(batch) for batch in client.batches) <= AzureSearchService.MAX_BATCH_SIZE
+    assert all(select == ["id"] for select in client.selects)
+    assert updates[-1][:2] == (2500, 2500)
+
+
+def bulk_service(monkeypatch, upload):
+    from types import SimpleNamespace
+
+    from azure_database_service import AzureSearchService
+    from openai_service import openai_service
+    from query_service import query_service
+
+    def embed(texts):
+        raise RuntimeError("embedding unavailable")
+
+    monkeypatch.setattr(openai_service, "get_embeddings_batch", embed)
+    monkeypatch.setattr(query_service, "summarise_message", lambda message: f"summary of {message}")
+    monkeypatch.setattr(query_service, "tag_summary", lambda summary: "tag")
+    service = AzureSearchService(search_endpoint="https://example.search.windows.net", search_key="key")
+    service._get_search_client = lambda index_name: SimpleNamespace(upload_documents=upload)
+    return service
+
+
+def test_bulk_upload_reports_mixed_success_and_failure(monkeypatch):
+    from types import SimpleNamespace
+
+    uploaded = []
+
+    def upload(documents):
+        uploaded.extend(documents)
+        return [
+            SimpleNamespace(key=doc["id"], succeeded=doc["id"] != "rejected", error_message="invalid field")
+            for doc in documents
+        ]
+
+    service = bulk_service(monkeypatch, upload)
+    documents = [
+        {"id": "ok", "message": "hello", "content_vector": [0.1]},
+        {"id": "rejected", "message": "world", "content_vector": [0.2]},
+        {"id": "unembedded", "message": "no vector"},
+    ]
+
+    report = service.upload_documents_bulk("messages", documents, batch_size=2, concurrency=2)
+
+    assert (report["total"], report["succeeded"], report["failed"]) == (3, 1, 2)
+    statuses = {result["id"]: result for result in report["results"]}
+    assert statuses["ok"]["status"] == "success"
+    assert statuses["rejected"]["error"] == "invalid field"
+    assert "Embedding failed" in statuses["unembedded"]["error"]
+    assert [doc["id"] for doc in uploaded] == ["ok", "rejected"]
+    assert uploaded[0]["summary"] == "summary of hello" and uploaded[0]["tag"] == "tag"
+
+
+def test_bulk_upload_rejects_duplicate_ids(monkeypatch):
+    service = bulk_service(monkeypatch, lambda documents: pytest.fail("uploaded"))
+
+    with pytest.raises(ValueError, match="Duplicate document ids: a"):
+        service.upload_documents_bulk("messages", [{"id": "a", "message": "x"}, {"id": "a", "message": "y"}])
+
+
+def test_only_http_links_are_rendered():
+    from azure_database_service import safe_link
+
+    assert safe_link("https://example.org/a") == "https://example.org/a"
+    assert safe_link("javascript:alert(1)") == "#"
+    assert safe_link(" JavaScript:alert(1)") == "#"
+    assert safe_link("java\tscript:alert(1)") == "#"
+    assert safe_link("") == "#"
+    rows = "".join(iter_results_table([{"id": "m1", "url": "javascript:alert(1)"}]))
+    assert "href='#'" in rows
+
+
+def test_stream_closes_the_table_before_reporting_an_error():
+    from azure_database_service import AzureSearchService
+
+    def results():
+        yield {"id": "m1", "uploadDate": "2024-05-01T09:30:00"}
+        raise RuntimeError("connection reset")
+
+    service = AzureSearchService(search_endpoint="https://example.search.windows.net", search_key="key")
+    service._search_messages_since = lambda since_date: results()
+
+    html = "".join(service.stream_messages_since(None))
+
+    assert html.index(RESULTS_TABLE_FOOTER) < html.index("<p>Error retrieving messages.</p>")
+    assert html.count(RESULTS_TABLE_FOOTER) == 1
+
+
+def test_delete_all_documents_skips_recently_deleted_keys_still_visible_to_search():
+    from types import SimpleNamespace
+
+    from azure_database_service import AzureSearchService
+
+    class LaggingClient:
+        def __init__(self, count):
+            self.documents = {str(index) for index in range(count)}
+            self.visible = set(self.documents)
+            self.deleted = []
+
+        def get_document_count(self):
+            return len(self.visible)
+
+        def search(self, search_text=None, select=None):
+            # Search sees deletions one pass late
+            keys, self.visible = sorted(self.visible), set(self.documents)
+            for key in keys:
+                yield {"id": key}
+
+        def delete_documents(self, documents):
+            keys = [document["id"] for document in documents]
+            self.deleted.extend(keys)
+            self.documents.difference_update(keys)
+            return [SimpleNamespace(key=key, succeeded=True, error_message=None) for key in keys]
+
+    client = LaggingClient(30)
+    service = AzureSearchService(search_endpoint="https://example.search.windows.net", search_key="key")
+    service._get_search_client = lambda index_name: client
+
+    report = service.delete_all_documents("messages", batch_size=10, max_passes=5, dedupe_seconds=60)
+
+    assert sorted(client.deleted) == sorted(str(index) for index in range(30))
+    assert report["deleted"] == 30 and report["passes"] == 2
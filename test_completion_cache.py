@@ -0,0 +1,26 @@
+from completion_cache import CompletionCache, MemoryCompletionBackend, SqliteCompletionBackend
+
+MESSAGES = [{"role": "user", "content": "Tag this summary: beaver reintroduction"}]
+
+
+def test_key_depends_on_model_prompt_and_params():
+    key = CompletionCache.make_key("gpt-4o", MESSAGES)
+
+    assert key == CompletionCache.make_key("gpt-4o", list(MESSAGES))
+    assert key != CompletionCache.make_key("gpt-4o-mini", MESSAGES)
+    assert key != CompletionCache.make_key("gpt-4o", MESSAGES, {"temperature": 0})
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    key = CompletionCache.make_key("gpt-4o", MESSAGES)
+    CompletionCache([SqliteCompletionBackend(path)]).set(key, "conservation")
+
+    memory = MemoryCompletionBackend()
+    cache = CompletionCache([memory, SqliteCompletionBackend(path)])
+
+    assert cache.get(key) == "conservation"
+    assert memory.get(key) == "conservation"
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
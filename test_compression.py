@@ -0,0 +1,59 @@
+import gzip
+
+from flask import Flask, Response, make_response
+
+from compression import Compressor, conditional
+
+PAGE = "<table class='min-w-full bg-white border border-gray-200'>" + "<tr><td>row</td></tr>" * 200
+
+
+def make_app():
+    app = Flask(__name__)
+    Compressor(min_size=512).init_app(app)
+
+    @app.route("/page")
+    def page():
+        return conditional(make_response(PAGE))
+
+    @app.route("/small")
+    def small():
+        return "<p>ok</p>"
+
+    @app.route("/stream")
+    def stream():
+        return Response(iter([PAGE]), mimetype="text/html")
+
+    return app
+
+
+def test_large_text_responses_are_gzipped_for_clients_that_accept_it():
+    client = make_app().test_client()
+
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).decode() == PAGE
+    assert response.headers["ETag"].startswith("W/")
+
+    assert "Content-Encoding" not in client.get("/page").headers
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_matching_etag_answers_not_modified():
+    client = make_app().test_client()
+    etag = client.get("/page").headers["ETag"]
+
+    response = client.get("/page", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_conditional_leaves_error_responses_untagged():
+    app = Flask(__name__)
+    with app.test_request_context("/"):
+        response = conditional(make_response("failed", 502))
+        assert response.status_code == 502 and "ETag" not in response.headers
@@ -0,0 +1,28 @@
+from context_packer import POLICY_FIELDS, ContextPacker
+
+
+def test_pack_projects_fields_and_keeps_top_ranked_items_within_budget():
+    packer = ContextPacker()
+    documents = [
+        {"_id": str(index), "$similarity": 0.9, "PolicyAssertion": f"Assertion {index} " + "x" * 200, "Year": 2020}
+        for index in range(10)
+    ]
+    budget = 3 * packer.count_tokens(packer.render(packer.project(documents[0], POLICY_FIELDS)))
+
+    text, report = packer.pack(documents, budget, POLICY_FIELDS)
+
+    assert text.splitlines()[0].startswith("- PolicyAssertion: Assertion 0")
+    assert "_id" not in text and "$similarity" not in text
+    assert report["items"] == 3 and report["dropped"] == 7 and report["truncated"]
+    assert report["tokens"] <= budget
+
+
+def test_without_fields_only_internal_fields_are_dropped_and_zero_budget_keeps_all():
+    packer = ContextPacker()
+    documents = [{"_id": "a", "$vector": [0.1], "title": "Beavers", "body": "Back in Knapdale"}] * 4
+
+    text, report = packer.pack(documents, 0)
+
+    assert text.splitlines()[0] == "- title: Beavers; body: Back in Knapdale"
+    assert report["items"] == 4 and not report["truncated"]
+    assert packer.stats()["packed"] == 1
@@ -0,0 +1,87 @@
+import database_factory
+from database_factory import DatabaseServiceFactory, DatabaseServicePool, DatabaseServiceRegistry
+
+
+class DummyService:
+    def __init__(self, **settings):
+        self.settings = settings
+        self.closed = False
+
+    def close_connection(self):
+        self.closed = True
+
+
+def dummy_create_service(provider=None, **kwargs):
+    return DummyService(**DatabaseServiceFactory.resolve_settings(provider, **kwargs))
+
+
+def test_pool_reuses_service(monkeypatch):
+    monkeypatch.setattr(DatabaseServiceFactory, "create_service", dummy_create_service)
+    pool = DatabaseServicePool()
+
+    first = pool.get_service("azure", search_endpoint="https://a", search_key="k")
+    second = pool.get_service("azure", search_endpoint="https://a", search_key="k")
+    assert first is second
+
+
+def test_pool_rebuilds_on_config_change(monkeypatch):
+    monkeypatch.setattr(DatabaseServiceFactory, "create_service", dummy_create_service)
+    pool = DatabaseServicePool()
+
+    first = pool.get_service("azure", search_endpoint="https://a", search_key="k")
+    second = pool.get_service("azure", search_endpoint="https://b", search_key="k")
+    assert first is not second
+    # The replaced service may still be in use by another request, so it is closed after a grace period
+    assert not first.closed
+
+    pool.close_all()
+    assert first.closed and second.closed
+
+
+def test_replaced_service_is_closed_after_the_grace_period(monkeypatch):
+    monkeypatch.setattr(DatabaseServiceFactory, "create_service", dummy_create_service)
+    monkeypatch.setenv("AZURE_SEARCH_ENDPOINT", "https://a")
+    monkeypatch.setenv("AZURE_SEARCH_KEY", "k")
+    pool = DatabaseServicePool(retire_after=0)
+
+    first = pool.get_service("azure")
+    assert pool.get_service("azure") is first
+    monkeypatch.setenv("AZURE_SEARCH_ENDPOINT", "https://b")
+    second = pool.get_service("azure")
+
+    assert second is not first and first.closed and not second.closed
+    assert pool.get_service("azure") is second
+
+
+def test_provider_is_detected_once(monkeypatch):
+    monkeypatch.setattr(DatabaseServiceFactory, "create_service", dummy_create_service)
+    detections = []
+    monkeypatch.setattr(DatabaseServiceFactory, "_detect_provider", lambda: detections.append(1) or "azure")
+    pool = DatabaseServicePool()
+
+    assert pool.get_service() is pool.get_service()
+    assert detections == [1]
+
+
+def test_pool_close_all(monkeypatch):
+    monkeypatch.setattr(DatabaseServiceFactory, "create_service", dummy_create_service)
+    pool = DatabaseServicePool()
+
+    service = pool.get_service("azure", search_endpoint="https://a", search_key="k")
+    pool.close_all()
+    assert service.closed
+    assert pool.get_service("azure", search_endpoint="https://a", search_key="k") is not service
+
+
+def test_registry_always_delegates_to_the_pool(monkeypatch):
+    monkeypatch.setattr(DatabaseServiceFactory, "create_service", dummy_create_service)
+    monkeypatch.setattr(database_factory, "database_pool", DatabaseServicePool())
+    registry = DatabaseServiceRegistry()
+
+    first = registry.switch_provider("azure", search_endpoint="https://a", search_key="k")
+    assert registry.get_service() is first
+
+    database_factory.database_pool.invalidate("azure")
+    assert first.closed
+    assert registry.get_service() is not first
+    registry.reset()
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded, bound_timeout, bound_timeout_ms, deadline_scope, remaining
+from retrieval_executor import RetrievalExecutor
+
+
+def test_timeouts_are_bounded_by_the_deadline():
+    assert bound_timeout(5) == 5
+    assert remaining() is None
+
+    with deadline_scope(1):
+        assert bound_timeout(5) <= 1
+        assert bound_timeout(0.5) == 0.5
+        assert bound_timeout() <= 1
+        assert 0 < bound_timeout_ms() <= 1000
+
+    assert remaining() is None
+
+
+def test_spent_deadline_raises():
+    with deadline_scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            bound_timeout(5, "completion")
+
+
+def test_deadline_follows_lookups_into_worker_threads():
+    executor = RetrievalExecutor(max_workers=2)
+
+    def slow():
+        time.sleep(1)
+        return ["late"]
+
+    with deadline_scope(0.2):
+        started = time.monotonic()
+        results = executor.run({"slow": slow, "left": remaining})
+
+    assert time.monotonic() - started < 0.9
+    assert results["slow"] == []
+    assert 0 < results["left"] <= 0.2
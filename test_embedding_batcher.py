@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from embedding_batcher import EmbeddingBatcher
+
+
+def test_concurrent_requests_share_one_call():
+    calls = []
+
+    def embed_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, window_ms=200, max_batch_size=16)
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def worker(text):
+        barrier.wait()
+        results[text] = batcher.embed(text, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(text,)) for text in ["a", "bb", "ccc", "bb"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"a": [1.0], "bb": [2.0], "ccc": [3.0]}
+    assert len(calls) == 1
+    assert sorted(calls[0]) == ["a", "bb", "ccc"]
+
+
+def test_errors_propagate_to_waiters():
+    def embed_batch(texts):
+        raise RuntimeError("rate limited")
+
+    batcher = EmbeddingBatcher(embed_batch, window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.embed("beavers", timeout=5)
+
+
+def test_short_provider_response_fails_the_batch_but_not_the_worker():
+    responses = [[], [[1.0]]]
+    batcher = EmbeddingBatcher(lambda texts: responses.pop(0), window_ms=1)
+
+    with pytest.raises(ValueError):
+        batcher.embed("a", timeout=5)
+    assert batcher.embed("a", timeout=5) == [1.0]
@@ -0,0 +1,35 @@
+from embedding_cache import EmbeddingCache
+
+
+def test_memory_hit_after_set():
+    cache = EmbeddingCache(max_size=4)
+    cache.set("model", "beavers", [0.1, 0.2])
+
+    assert cache.get("model", "beavers") == [0.1, 0.2]
+    assert cache.get("other-model", "beavers") is None
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache(max_size=2)
+    cache.set("model", "a", [1.0])
+    cache.set("model", "b", [2.0])
+    cache.get("model", "a")
+    cache.set("model", "c", [3.0])
+
+    assert cache.get("model", "b") is None
+    assert cache.get("model", "a") == [1.0]
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path=path).set("model", "red squirrels", [0.25, -0.5])
+
+    cache = EmbeddingCache(path=path)
+    assert cache.get("model", "red squirrels") == [0.25, -0.5]
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_normalize_collapses_whitespace():
+    assert EmbeddingCache.normalize("  Trust's   view\non beavers ") == "Trust's view on beavers"
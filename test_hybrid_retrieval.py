@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from hybrid_retrieval import HybridRetriever, reciprocal_rank_fusion
+
+
+class StubEmbeddings:
+    def get(self, text):
+        return [1.0, 0.0]
+
+
+def test_documents_found_by_several_sources_rank_first():
+    fused = reciprocal_rank_fusion(
+        {
+            "policy": [{"_id": "a"}, {"_id": "b"}],
+            "messages": [{"id": "c"}, {"id": "b"}],
+        }
+    )
+
+    assert [entry["document"].get("_id") or entry["document"].get("id") for entry in fused] == ["b", "a", "c"]
+    assert fused[0]["sources"] == ["policy", "messages"]
+
+
+def test_returns_what_arrived_before_the_deadline():
+    def slow(query, vector, limit):
+        time.sleep(1)
+        return [{"_id": "late"}]
+
+    def failing(query, vector, limit):
+        raise RuntimeError("unavailable")
+
+    retriever = HybridRetriever(
+        sources={
+            "fast": lambda query, vector, limit: [{"_id": "a", "$vector": vector}],
+            "slow": slow,
+            "failing": failing,
+        }
+    )
+
+    retrieved = retriever.retrieve("peat", timeout=0.2, embeddings=StubEmbeddings())
+
+    assert [entry["document"] for entry in retrieved["results"]] == [{"_id": "a"}]
+    assert sorted(retrieved["missing"]) == ["failing", "slow"]
+    assert retrieved["sources"] == {"fast": 1}
+
+
+def test_default_sources_are_used_when_none_are_named():
+    called = []
+
+    def source(name):
+        return lambda query, vector, limit: called.append(name) or [{"_id": name}]
+
+    retriever = HybridRetriever(sources={"a": source("a"), "b": source("b")}, default_sources=["a"])
+
+    retrieved = retriever.retrieve("peat", embeddings=StubEmbeddings())
+
+    assert called == ["a"]
+    assert retrieved["sources"] == {"a": 1}
+    with pytest.raises(ValueError):
+        retriever.retrieve("peat", sources=["a", "missing"], embeddings=StubEmbeddings())
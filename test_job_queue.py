@@ -0,0 +1,86 @@
+import time
+
+from job_queue import JobQueue
+
+
+def wait_for(jobs, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] in ("completed", "partial", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_reports_progress_and_result():
+    jobs = JobQueue(workers=1)
+
+    def work(count, progress):
+        for done in range(1, count + 1):
+            progress(done, count)
+        return {"processed": count}
+
+    job = wait_for(jobs, jobs.submit("work", work, 3).id)
+
+    assert job["status"] == "completed"
+    assert job["result"] == {"processed": 3}
+    assert job["progress"]["done"] == 3
+
+
+def test_failures_are_recorded():
+    jobs = JobQueue(workers=1)
+
+    def broken(progress):
+        raise RuntimeError("index unavailable")
+
+    assert wait_for(jobs, jobs.submit("broken", broken).id)["error"] == "index unavailable"
+    assert wait_for(jobs, jobs.submit("false", lambda progress: False).id)["status"] == "failed"
+
+    report = {"deleted": 3, "failed": 1}
+    partial = wait_for(jobs, jobs.submit("partial", lambda progress: report).id)
+    assert partial["status"] == "partial" and partial["result"] == report
+
+
+def test_state_is_shared_through_store(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    runner = JobQueue(workers=1, path=path)
+    observer = JobQueue(workers=1, path=path)
+
+    job = runner.submit("noop", lambda progress: True)
+
+    assert wait_for(observer, job.id)["status"] == "completed"
+    assert observer.get("missing") is None
+
+
+def test_job_lost_with_its_process_is_reported_failed(tmp_path):
+    import json
+
+    path = str(tmp_path / "jobs.sqlite")
+    runner = JobQueue(workers=1, path=path)
+    observer = JobQueue(workers=1, path=path, stale_after=30)
+    job = runner.submit("noop", lambda progress: True)
+    wait_for(runner, job.id)
+
+    # Simulate a process that died mid-job, leaving a running record with an old heartbeat
+    state = dict(job.to_dict(), status="running", finished_at=None, owner=-1, heartbeat_at=time.time() - 60)
+    runner._store.set("lost", json.dumps(dict(state, id="lost")).encode("utf-8"))
+    runner._store.set("live", json.dumps(dict(state, id="live", heartbeat_at=time.time())).encode("utf-8"))
+
+    lost = observer.get("lost")
+    assert lost["status"] == "failed" and "-1" in lost["error"]
+    assert runner.get("lost")["status"] == "failed"
+    assert observer.get("live")["status"] == "running"
+
+
+def test_heartbeat_keeps_long_running_jobs_alive():
+    import threading
+
+    release = threading.Event()
+    jobs = JobQueue(workers=1, heartbeat_interval=0.05, stale_after=0.3)
+    job = jobs.submit("slow", lambda progress: release.wait(5))
+
+    time.sleep(0.6)
+    assert jobs.get(job.id)["status"] == "running"
+    release.set()
+    assert wait_for(jobs, job.id)["status"] == "completed"
@@ -0,0 +1,40 @@
+import neo4j_handler
+from neo4j_handler import Neo4jHandler, close_driver, get_driver
+
+
+def test_handlers_share_one_driver(monkeypatch):
+    monkeypatch.setenv("NEO4JURL", "bolt://localhost:7687")
+    close_driver()
+
+    first = Neo4jHandler()
+
+    assert Neo4jHandler().driver is first.driver is get_driver()
+    close_driver()
+    assert neo4j_handler._driver is None
+
+
+def test_driver_is_recreated_after_fork(monkeypatch):
+    monkeypatch.setenv("NEO4JURL", "bolt://localhost:7687")
+    parent = get_driver()
+
+    monkeypatch.setattr(neo4j_handler, "_pid", -1)
+
+    assert get_driver() is not parent
+    close_driver()
+    parent.close()
+
+
+def test_graph_rag_statement_uses_supplied_vector():
+    query, parameters = neo4j_handler.graph_rag_statement("peatland", vector=[0.1, 0.2], top_k=5, expand_limit=50)
+
+    assert "genai.vector.encode" not in query
+    assert "$embedding" in query and "LIMIT $expandLimit" in query
+    assert parameters == {"topK": 5, "embedding": [0.1, 0.2], "expandLimit": 50}
+
+
+def test_graph_rag_statement_falls_back_to_server_embedding():
+    query, parameters = neo4j_handler.graph_rag_statement("peatland")
+
+    assert "genai.vector.encode" in query
+    assert "LIMIT" not in query
+    assert parameters["searchTerm"] == "peatland" and parameters["topK"] == 10
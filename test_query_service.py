@@ -0,0 +1,137 @@
+from query_service import QueryService
+
+
+def test_component_results_are_deduplicated_by_best_similarity():
+    first = [{"_id": "a", "$similarity": 0.7, "PolicyAssertion": "Peat"}, {"_id": "b", "$similarity": 0.9}]
+    second = [{"_id": "a", "$similarity": 0.95, "PolicyAssertion": "Peat"}, {"_id": "c", "$similarity": 0.5}]
+
+    merged = QueryService._merge_component_results([first, second], max_documents=10)
+
+    assert [document["_id"] for document in merged] == ["a", "b", "c"]
+    assert all("$similarity" not in document for document in merged)
+
+
+def test_component_results_respect_document_cap():
+    documents = [{"_id": str(index), "$similarity": 1 - index / 100, "text": "x" * 100} for index in range(20)]
+
+    merged = QueryService._merge_component_results([documents], max_documents=5)
+
+    assert [document["_id"] for document in merged] == ["0", "1", "2", "3", "4"]
+
+
+def visitor_service(monkeypatch, embed):
+    import query_service
+    from openai_service import openai_service
+    from semantic_cache import SemanticCache
+
+    monkeypatch.setattr(openai_service, "get_embeddings", embed)
+    monkeypatch.setattr(openai_service, "generate_completion", lambda messages, **kwargs: "text")
+    monkeypatch.setattr(query_service.config, "semantic_cache_enabled", True)
+    monkeypatch.setattr(query_service, "semantic_cache", SemanticCache())
+    return QueryService()
+
+
+def test_visitor_query_embeds_the_query_once(monkeypatch):
+    import query_service
+
+    embedded = []
+    service = visitor_service(monkeypatch, lambda text: embedded.append(text) or [1.0, 0.0])
+    monkeypatch.setattr(
+        query_service.database_service,
+        "get_visitor_evidence_context",
+        lambda query, vector=None: [{"Name": "Survey", "PolicyAssertion": "P", "Evidence": "Otters", "Year": 2024}],
+    )
+
+    service.process_visitor_query("otters")
+
+    assert embedded == ["otters"]
+
+
+def test_visitor_query_degrades_when_embedding_fails(monkeypatch):
+    import query_service
+
+    def embed(text):
+        raise RuntimeError("embedding unavailable")
+
+    service = visitor_service(monkeypatch, embed)
+    seen = []
+    monkeypatch.setattr(
+        query_service.database_service,
+        "get_visitor_evidence_context",
+        lambda query, vector=None: seen.append(vector) or [],
+    )
+
+    assert "Analysis" in service.process_visitor_query("otters")
+    assert seen == [None]
+
+
+def test_analysis_and_evidence_summary_run_concurrently_with_the_request_context(monkeypatch):
+    import threading
+
+    from deadline import current_deadline, deadline_scope
+
+    # Each completion waits for the other, so this only passes if they run side by side
+    barrier = threading.Barrier(2, timeout=5)
+    deadlines = {}
+
+    def generate_completion(messages, task=None, **kwargs):
+        barrier.wait()
+        deadlines[task] = current_deadline()
+        return task
+
+    service = visitor_service(monkeypatch, lambda text: [1.0, 0.0])
+    monkeypatch.setattr("openai_service.openai_service.generate_completion", generate_completion)
+    monkeypatch.setattr(service, "_visitor_messages", lambda query, embeddings: ([], "context", []))
+
+    with deadline_scope(30):
+        html = service.process_visitor_query("otters", use_cache=False)
+        request_deadline = current_deadline()
+
+    assert "analysis" in html and "evidence_summary" in html
+    assert deadlines == {"analysis": request_deadline, "evidence_summary": request_deadline}
+
+
+def test_advanced_query_degrades_when_embedding_fails(monkeypatch):
+    import pytest
+
+    import query_service
+    from openai_service import openai_service
+
+    def embed_batch(texts):
+        raise RuntimeError("embedding unavailable")
+
+    prompts = []
+    monkeypatch.setattr(openai_service, "get_embeddings_batch", embed_batch)
+    monkeypatch.setattr(openai_service, "generate_completion", lambda messages, **kwargs: prompts.append(messages))
+    monkeypatch.setattr(
+        query_service.database_service, "get_policy_assertions", lambda *args, **kwargs: pytest.fail("searched")
+    )
+    service = QueryService()
+    monkeypatch.setattr(service, "break_down_query", lambda query: [{"component": "peat"}, {"component": "otters"}])
+
+    service.process_advanced_query("peat and otters")
+
+    assert len(prompts) == 1 and "Query: peat and otters" in prompts[0][0]["content"]
+
+
+def test_blog_prompt_degrades_when_embedding_fails(monkeypatch):
+    import query_service
+    from openai_service import EmbeddingContext
+
+    def embed(text):
+        raise RuntimeError("embedding unavailable")
+
+    service = visitor_service(monkeypatch, embed)
+    seen = []
+    monkeypatch.setattr(query_service.database_service, "get_blog_assertions", lambda query: [])
+    monkeypatch.setattr(
+        query_service.database_service,
+        "get_policy_assertions",
+        lambda query, vector=None: seen.append(vector) or [],
+    )
+
+    messages, documents = service._blog_messages("beavers", EmbeddingContext())
+
+    assert "Query: beavers" in messages[0]["content"]
+    assert documents == []
+    assert seen == [None]
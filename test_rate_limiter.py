@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from rate_limiter import RateLimiter, TokenBucket
+
+
+class Throttled(Exception):
+    pass
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=600)
+    bucket.acquire(600)
+
+    started = time.monotonic()
+    waited = bucket.acquire(5)
+
+    assert waited > 0
+    assert time.monotonic() - started >= 0.4
+
+
+def test_retries_with_server_hint():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Throttled()
+        return "ok"
+
+    limiter = RateLimiter(
+        max_retries=5,
+        is_retryable=lambda e: isinstance(e, Throttled),
+        retry_after=lambda e: 0.01,
+        is_throttled=lambda e: isinstance(e, Throttled),
+    )
+
+    assert limiter.call(flaky) == "ok"
+    assert limiter.stats()["retries"] == 2
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_non_retryable_errors_raise_immediately():
+    limiter = RateLimiter(max_retries=5, is_retryable=lambda e: False)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert limiter.stats()["failures"] == 1
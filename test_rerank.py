@@ -0,0 +1,37 @@
+from rerank import rerank, strip_vectors
+
+
+def document(name, similarity, vector):
+    return {"_id": name, "$similarity": similarity, "$vector": vector}
+
+
+def test_near_duplicates_are_dropped_and_distinct_results_kept():
+    documents = [
+        document("a", 0.95, [1.0, 0.0, 0.0]),
+        document("a-copy", 0.94, [0.999, 0.01, 0.0]),
+        document("b", 0.90, [0.0, 1.0, 0.0]),
+        document("c", 0.85, [0.0, 0.0, 1.0]),
+    ]
+
+    selected = rerank(documents, limit=3, duplicate_threshold=0.97)
+
+    assert [doc["_id"] for doc in selected] == ["a", "b", "c"]
+
+
+def test_diversity_prefers_distinct_over_similar_results():
+    documents = [
+        document("a", 0.95, [1.0, 0.0]),
+        document("close", 0.94, [0.9, 0.1]),
+        document("other", 0.90, [0.0, 1.0]),
+    ]
+
+    assert [doc["_id"] for doc in rerank(documents, limit=2, diversity=0.0)] == ["a", "close"]
+    assert [doc["_id"] for doc in rerank(documents, limit=2, diversity=0.7)] == ["a", "other"]
+
+
+def test_cutoff_keeps_at_least_the_best_result():
+    documents = [document("a", 0.7, [1.0, 0.0]), document("b", 0.6, [0.0, 1.0])]
+
+    assert [doc["_id"] for doc in rerank(documents, min_similarity=0.65)] == ["a"]
+    assert [doc["_id"] for doc in rerank(documents, min_similarity=0.9)] == ["a"]
+    assert strip_vectors(documents[:1]) == [{"_id": "a", "$similarity": 0.7}]
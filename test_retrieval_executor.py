@@ -0,0 +1,28 @@
+import time
+
+from retrieval_executor import RetrievalExecutor
+
+
+def test_lookups_run_in_parallel():
+    executor = RetrievalExecutor(max_workers=4)
+
+    def slow(value):
+        time.sleep(0.3)
+        return [value]
+
+    started = time.monotonic()
+    results = executor.run({"a": lambda: slow(1), "b": lambda: slow(2)}, timeout=5)
+
+    assert results == {"a": [1], "b": [2]}
+    assert time.monotonic() - started < 0.55
+
+
+def test_failed_and_late_lookups_fall_back():
+    executor = RetrievalExecutor(max_workers=4)
+
+    def fail():
+        raise RuntimeError("collection unavailable")
+
+    results = executor.run({"fast": lambda: [1], "broken": fail, "late": lambda: time.sleep(1) or [2]}, timeout=0.2)
+
+    assert results == {"fast": [1], "broken": [], "late": []}
@@ -1,6 +1,8 @@
+import pytest
 from routes import get_azure_service
 from openai_service import openai_service
 import routes
+from deadline import DeadlineExceeded
 from flask import Flask, request
 
 class DummyAzureService:
@@ -25,3 +27,125 @@ def test_add_message_success(monkeypatch):
     }
     response = client.post("/add_message", json=data)
     assert response.status_code == 200
+
+
+def api_client(monkeypatch):
+    monkeypatch.setattr(routes.config, "api_key", "test-key")
+    app = Flask(__name__)
+    app.register_blueprint(routes.routes_bp)
+    client = app.test_client()
+    client.environ_base["HTTP_X_API_KEY"] = "test-key"
+    return client
+
+
+def test_hybrid_rejects_bad_limit_and_timeout(monkeypatch):
+    import hybrid_retrieval
+
+    monkeypatch.setattr(hybrid_retrieval.hybrid_retriever, "retrieve", lambda *args, **kwargs: pytest.fail("called"))
+    client = api_client(monkeypatch)
+
+    assert client.post("/hybrid", json={"query": "peat", "limit": "ten"}).status_code == 400
+    assert client.post("/hybrid", json={"query": "peat", "timeout": "soon"}).status_code == 400
+    assert client.post("/hybrid", json={"query": "peat", "limit": 0}).status_code == 400
+
+
+def test_hybrid_serialises_driver_types_in_documents(monkeypatch):
+    import uuid
+
+    import hybrid_retrieval
+
+    document_id = uuid.uuid4()
+    retrieved = {
+        "results": [{"document": {"_id": document_id, "Year": 2024}, "score": 0.5, "sources": ["a"]}],
+        "sources": {"a": 1},
+        "missing": ["b"],
+        "elapsed": 0.01,
+    }
+    monkeypatch.setattr(hybrid_retrieval.hybrid_retriever, "retrieve", lambda *args, **kwargs: retrieved)
+    client = api_client(monkeypatch)
+
+    body = client.post("/hybrid", json={"query": "peat"}).get_json()
+
+    assert body["results"][0]["document"] == {"_id": str(document_id), "Year": 2024}
+    assert body["missing"] == ["b"] and body["count"] == 1
+
+
+class BulkAzureService:
+    def __init__(self):
+        self.documents = None
+
+    def upload_documents_bulk(self, index_name, documents):
+        self.documents = documents
+        results = [{"id": doc["id"], "status": "success"} for doc in documents]
+        return {"total": len(documents), "succeeded": len(documents), "failed": 0, "results": results}
+
+
+def test_add_messages_rejects_invalid_and_duplicate_items(monkeypatch):
+    service = BulkAzureService()
+    monkeypatch.setattr("routes.get_azure_service", lambda: service)
+    client = api_client(monkeypatch)
+
+    response = client.post(
+        "/add_messages",
+        json={"messages": [{"id": "a", "message": "one"}, {"message": ""}, {"id": "a", "message": "again"}]},
+    )
+
+    body = response.get_json()
+    assert response.status_code == 207
+    assert [doc["id"] for doc in service.documents] == ["a"]
+    assert (body["total"], body["succeeded"], body["failed"]) == (3, 1, 2)
+    assert [(item["index"], item["error"]) for item in body["rejected"]] == [
+        (1, "'message' field is required"),
+        (2, "Duplicate id"),
+    ]
+
+
+def test_add_messages_accepts_ndjson_and_validates_the_body(monkeypatch):
+    service = BulkAzureService()
+    monkeypatch.setattr("routes.get_azure_service", lambda: service)
+    client = api_client(monkeypatch)
+
+    response = client.post("/add_messages", data='{"message": "one"}\n{"message": "two"}\n')
+    assert response.status_code == 200
+    assert [doc["message"] for doc in service.documents] == ["one", "two"]
+
+    assert client.post("/add_messages", data="{not json").status_code == 400
+    assert client.post("/add_messages", json=[]).status_code == 400
+
+
+def test_recent_messages_failure_is_an_uncached_error(monkeypatch):
+    class FailingAzureService:
+        def find_messages_since(self, since_date, return_format="html"):
+            raise RuntimeError("search unavailable")
+
+    monkeypatch.setattr("routes.get_azure_service", lambda: FailingAzureService())
+    client = api_client(monkeypatch)
+
+    response = client.get("/get_recent_messages")
+
+    assert response.status_code == 500
+    assert "ETag" not in response.headers
+
+
+def test_semantic_cache_is_skipped_only_on_explicit_opt_out():
+    app = Flask(__name__)
+
+    with app.test_request_context("/", headers={"Cache-Control": "no-cache"}):
+        assert not routes.cache_bypassed()
+    with app.test_request_context("/", headers={"X-Cache-Bypass": "1"}):
+        assert routes.cache_bypassed()
+    with app.test_request_context("/?nocache=true"):
+        assert routes.cache_bypassed()
+
+
+def test_stream_deadline_before_first_event_is_a_timeout(monkeypatch):
+    def expired(query, use_cache=True):
+        raise DeadlineExceeded("retrieval took too long")
+
+    monkeypatch.setattr("routes.query_service.stream_policy_query", expired)
+    client = api_client(monkeypatch)
+
+    response = client.post("/policyquery?stream=1", json={"query": "pine martens"})
+
+    assert response.status_code == 504
+    assert response.get_json() == {"error": "Request timed out: retrieval took too long"}
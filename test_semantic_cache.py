@@ -0,0 +1,38 @@
+from semantic_cache import SemanticCache
+
+
+DOCUMENTS = [{"_id": "1", "PolicyAssertion": "Beavers benefit wetlands", "$similarity": 0.91}]
+
+
+def test_similar_query_over_same_documents_hits():
+    cache = SemanticCache(threshold=0.9)
+    fingerprint = SemanticCache.fingerprint(DOCUMENTS)
+    cache.store("policyquery", [1.0, 0.0], fingerprint, "<p>answer</p>")
+
+    assert cache.lookup("policyquery", [0.99, 0.05], fingerprint) == "<p>answer</p>"
+    assert cache.lookup("blog", [0.99, 0.05], fingerprint) is None
+    assert cache.lookup("policyquery", [0.0, 1.0], fingerprint) is None
+
+
+def test_changed_documents_miss():
+    cache = SemanticCache(threshold=0.9)
+    cache.store("policyquery", [1.0, 0.0], SemanticCache.fingerprint(DOCUMENTS), "<p>answer</p>")
+    changed = [dict(DOCUMENTS[0], PolicyAssertion="Beavers benefit rivers")]
+
+    assert cache.lookup("policyquery", [1.0, 0.0], SemanticCache.fingerprint(changed)) is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_fingerprint_ignores_scores():
+    rescored = [dict(DOCUMENTS[0], **{"$similarity": 0.5})]
+
+    assert SemanticCache.fingerprint(rescored) == SemanticCache.fingerprint(DOCUMENTS)
+
+
+def test_lru_eviction():
+    cache = SemanticCache(threshold=0.9, max_entries=1)
+    cache.store("blog", [1.0, 0.0], "a", "first")
+    cache.store("blog", [0.0, 1.0], "b", "second")
+
+    assert cache.lookup("blog", [1.0, 0.0], "a") is None
+    assert cache.lookup("blog", [0.0, 1.0], "b") == "second"
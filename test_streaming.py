@@ -0,0 +1,44 @@
+import json
+
+from deadline import DeadlineExceeded
+from streaming import sse_event, stream_markdown
+
+
+def parse(events):
+    parsed = []
+    for event in events:
+        name, data = event.strip().split("\n")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_sse_event_encodes_newlines():
+    assert sse_event("delta", {"text": "a\nb"}) == 'event: delta\ndata: {"text": "a\\nb"}\n\n'
+
+
+def test_stream_markdown_sends_deltas_and_final_html():
+    events = parse(stream_markdown(["# Title\n", "Body"], render=lambda text: f"<p>{text}</p>", interval=0))
+
+    assert [name for name, _ in events] == ["delta", "html", "delta", "done"]
+    assert events[1][1]["html"] == "<p># Title\n</p>"
+    assert events[-1][1]["html"] == "<p># Title\nBody</p>"
+
+
+def test_stream_markdown_reports_errors():
+    def deltas():
+        yield "partial"
+        raise RuntimeError("connection reset")
+
+    events = parse(stream_markdown(deltas(), render=str))
+
+    assert events[-1] == ("error", {"error": "connection reset"})
+
+
+def test_stream_markdown_reports_timeouts():
+    def deltas():
+        yield "partial"
+        raise DeadlineExceeded("")
+
+    events = parse(stream_markdown(deltas(), render=str))
+
+    assert events[-1] == ("error", {"error": "Request timed out: deadline exceeded", "timeout": True})
@@ -0,0 +1,70 @@
+from config import Config
+from task_stats import TaskStats
+
+
+def test_records_latency_tokens_and_cost_per_task():
+    stats = TaskStats(prices={"gpt-4o-mini": {"input": 0.15, "output": 0.60}})
+    stats.record("tag_summary", "gpt-4o-mini", 0.2, prompt_tokens=1000, completion_tokens=10)
+    stats.record("tag_summary", "gpt-4o-mini", 0.4, error=TimeoutError())
+
+    tag = stats.stats()["tag_summary"]
+    assert tag["calls"] == 2
+    assert tag["errors"] == 1
+    assert tag["latency_avg"] == 0.3
+    assert tag["latency_max"] == 0.4
+    assert tag["cost_usd"] == round((1000 * 0.15 + 10 * 0.60) / 1_000_000, 6)
+    assert tag["models"] == {"gpt-4o-mini": 2}
+
+
+def test_task_route_overrides_fill_from_default():
+    routes = Config._load_task_routes('{"tag_summary": {"max_tokens": 8}, "custom": {"model": "gpt-4o-mini"}}')
+    config = Config.__new__(Config)
+    config.task_routes = routes
+
+    assert config.task_route("tag_summary")["max_tokens"] == 8
+    assert config.task_route("tag_summary")["model"] == "gpt-4o-mini"
+    assert config.task_route("custom")["timeout"] == routes["default"]["timeout"]
+    assert config.task_route(None) == routes["default"]
+    assert config.task_route("unknown")["model"] == routes["default"]["model"]
+
+
+def test_stream_abandoned_by_the_consumer_is_recorded_as_cancelled(monkeypatch):
+    from types import SimpleNamespace
+
+    from openai_service import OpenAIService
+
+    def chunk(text):
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: iter([chunk("a"), chunk("b")])))
+    )
+    service = OpenAIService()
+    monkeypatch.setattr(service, "get_client", lambda: client)
+
+    stream = service.stream_completion([{"role": "user", "content": "hi"}], task="analysis")
+    assert next(stream) == "a"
+    stream.close()
+
+    analysis = service.task_stats.stats()["analysis"]
+    assert (analysis["calls"], analysis["errors"], analysis["cancelled"]) == (1, 0, 1)
+
+
+def test_visitor_completions_use_their_routed_timeouts(monkeypatch):
+    from openai_service import openai_service
+    from query_service import QueryService
+
+    timeouts = {}
+
+    def generate_completion(messages, model=None, timeout=None, cache=False, task=None):
+        timeouts[task] = timeout
+        return "text"
+
+    monkeypatch.setattr(openai_service, "generate_completion", generate_completion)
+    service = QueryService()
+    monkeypatch.setattr(service, "_visitor_messages", lambda query, embeddings: ([], "context", []))
+
+    service.process_visitor_query("peat", use_cache=False)
+
+    # No explicit timeout, so the evidence summary keeps its shorter routed timeout
+    assert timeouts == {"analysis": None, "evidence_summary": None}
@@ -0,0 +1,48 @@
+import threading
+
+from text_formatter import TextFormatter, text_formatter
+
+ANSWER = "## Findings\n\n| Site | Species |\n|---|---|\n| Knapdale | Beaver |\n"
+
+
+def test_tables_get_tailwind_classes_and_a_preceding_break():
+    html = text_formatter.format_to_html(ANSWER)
+
+    assert "\n" not in html
+    assert '<br /><table class="table-auto border-collapse border border-gray-300">' in html
+    assert '<th class="border border-gray-300 bg-gray-100 px-4 py-2 text-left">Site</th>' in html
+    assert '<td class="border border-gray-300 px-4 py-2">Beaver</td>' in html
+
+
+def test_markdown_instance_is_reused_per_thread_without_leaking_state():
+    first = TextFormatter._markdown()
+    assert TextFormatter._markdown() is first
+
+    others = []
+    thread = threading.Thread(target=lambda: others.append(TextFormatter._markdown()))
+    thread.start()
+    thread.join()
+    assert others[0] is not first
+
+    assert text_formatter.format_to_html(ANSWER) == text_formatter.format_to_html(ANSWER)
+    assert "Knapdale" not in text_formatter.format_to_html("Plain answer")
+
+
+def test_context_items_match_the_original_formatting():
+    items = [{"Name": "Report", "PolicyAssertion": "Restore peat", "Evidence": "Survey", "Year": 2021}]
+
+    assert text_formatter.format_context_items(items) == (
+        "<ul><li><strong>Report</strong> - Assertion: Restore peat - "
+        "[Evidence: <span>Survey</span>] - <span>2021</span></li></ul>"
+    )
+    assert text_formatter.format_context_items(items, "other") == f"<div>{items}</div>"
+
+
+def test_policy_items_render_every_field():
+    items = [{"PolicyAssertion": "Restore peat", "Name": "Report", "Year": 2021, "Page": 4, "Link": "https://a.org"}]
+
+    assert text_formatter.format_context_items(items, "policy_assertions") == (
+        "<ul><li>Assertion: <span>Restore peat</span> - Source: <strong>Report</strong> - "
+        "Year: <span>2021</span> - Page: <span>4</span> - "
+        "Link: <a href='https://a.org'>https://a.org</a></li></ul>"
+    )
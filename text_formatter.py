@@ -2,38 +2,72 @@
 Text formatting utilities.
 """
 
+import threading
+import xml.etree.ElementTree as etree
+
 import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+# Tailwind classes applied to tables in rendered answers
+TABLE_CLASSES = {
+    "table": "table-auto border-collapse border border-gray-300",
+    "th": "border border-gray-300 bg-gray-100 px-4 py-2 text-left",
+    "td": "border border-gray-300 px-4 py-2",
+}
+
+# Add Tailwind CSS CDN reference and wrap the HTML in a styled container
+STYLED_HTML_PREFIX = (
+    "<link href='https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css' rel='stylesheet'>"
+    "<div class='prose max-w-none bg-gradient-to-r from-blue-50 to-blue-100 "
+    "p-12 rounded-2xl shadow-xl hover:shadow-2xl transition-shadow duration-300 border border-blue-200'>"
+)
+STYLED_HTML_SUFFIX = "</div>"
+
+
+class TailwindTableTreeprocessor(Treeprocessor):
+    """Adds Tailwind classes to tables, headers and cells, with a line break before each table."""
+
+    def run(self, root):
+        parents = [parent for parent in root.iter() if parent.find("table") is not None]
+        for parent in parents:
+            for table in parent.findall("table"):
+                parent.insert(list(parent).index(table), etree.Element("br"))
+        for tag, classes in TABLE_CLASSES.items():
+            for element in root.iter(tag):
+                element.set("class", classes)
+
+
+class TailwindTableExtension(Extension):
+    """Markdown extension registering TailwindTableTreeprocessor."""
+
+    def extendMarkdown(self, md):
+        # Lowest priority so it runs after inline processing and prettifying
+        md.treeprocessors.register(TailwindTableTreeprocessor(md), "tailwind_tables", 5)
 
 
 class TextFormatter:
     """Utility class for text formatting operations."""
 
-    @staticmethod
-    def format_to_html(text: str) -> str:
+    # Markdown instances keep parser state between calls, so each thread gets its own
+    _local = threading.local()
+
+    @classmethod
+    def _markdown(cls) -> markdown.Markdown:
+        """Return this thread's Markdown instance, reset for a new document."""
+        md = getattr(cls._local, "markdown", None)
+        if md is None:
+            md = markdown.Markdown(extensions=["markdown.extensions.tables", TailwindTableExtension()])
+            cls._local.markdown = md
+        return md.reset()
+
+    @classmethod
+    def format_to_html(cls, text: str) -> str:
         """Convert markdown text to HTML with improved Tailwind CSS styling."""
-        html = markdown.markdown(text, extensions=["markdown.extensions.tables"])
-        # Replace \n with <br> to maintain line breaks, but avoid adding extra gaps
+        html = cls._markdown().convert(text)
+        # Remove \n to maintain line breaks without adding extra gaps
         html = html.replace("\n", "")
-
-        # Post-process the HTML to inject Tailwind classes into tables
-        html = html.replace("<table>", "<br><table class='table-auto border-collapse border border-gray-300'>")
-        html = html.replace("<th>", "<th class='border border-gray-300 bg-gray-100 px-4 py-2 text-left'>")
-        html = html.replace("<td>", "<td class='border border-gray-300 px-4 py-2'>")
-
-        # Add Tailwind CSS CDN reference
-        tailwind_cdn = (
-            "<link href='https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css' rel='stylesheet'>"
-        )
-
-        # Wrap the HTML in a styled container using enhanced Tailwind CSS classes
-        styled_html = (
-            f"{tailwind_cdn}"
-            "<div class='prose max-w-none bg-gradient-to-r from-blue-50 to-blue-100 "
-            "p-12 rounded-2xl shadow-xl hover:shadow-2xl transition-shadow duration-300 border border-blue-200'>"
-            f"{html}"
-            "</div>"
-        )
-        return styled_html
+        return f"{STYLED_HTML_PREFIX}{html}{STYLED_HTML_SUFFIX}"
 
     @staticmethod
     def format_context_items(items: list, format_type: str = "visitor_evidence") -> str: